@@ -0,0 +1,188 @@
+import random
+from typing import Callable, Dict, List, NamedTuple
+
+# synthetic traffic, shaped like what a busy network sends a client. lines
+# are raw bytes so decoding is measured along with parsing
+
+class Corpus(NamedTuple):
+    # fed to a fresh Server first, not measured
+    setup:    List[bytes]
+    # what's measured
+    workload: List[bytes]
+    # times setup+workload are run; best is kept
+    rounds:   int
+
+SERVER  = "irc.bench.example"
+NETWORK = "BenchNet"
+
+def _nicknames(count: int, rand: random.Random) -> List[str]:
+    nicknames: List[str] = []
+    for i in range(count):
+        stem = "".join(rand.choice("abcdefghijklmnopqrstuvwxyz")
+            for _ in range(rand.randint(3, 9)))
+        nicknames.append(f"{stem}{i}")
+    return nicknames
+
+def _hostmask(nickname: str, i: int) -> str:
+    if i % 3 == 0:
+        host = f"user/{nickname}"
+    elif i % 3 == 1:
+        host = f"{i%250}.{i%199}.{i%113}.{i%97}"
+    else:
+        host = f"host-{i}.dsl.isp{i%17}.example"
+    return f"{nickname}!~{nickname[:8]}@{host}"
+
+def registration() -> List[bytes]:
+    lines = [
+        f":{SERVER} CAP * LS :account-notify away-notify chghost "
+            "extended-join multi-prefix sasl userhost-in-names",
+        f":{SERVER} CAP * ACK :account-notify away-notify chghost "
+            "extended-join multi-prefix userhost-in-names",
+        f":{SERVER} 001 me :Welcome to the {NETWORK} IRC Network me",
+        f":{SERVER} 002 me :Your host is {SERVER}",
+        f":{SERVER} 005 me CALLERID=g WHOX ETRACE FNC SAFELIST "
+            "ELIST=CTU KNOCK MONITOR=100 CHANTYPES=# EXCEPTS INVEX "
+            "CHANMODES=eIbq,k,flj,CFLMPQScgimnprstuz "
+            ":are supported by this server",
+        f":{SERVER} 005 me CHANLIMIT=#:250 PREFIX=(ov)@+ MAXLIST=bqeI:100 "
+            "MODES=4 NETWORK=BenchNet STATUSMSG=@+ CASEMAPPING=rfc1459 "
+            "NICKLEN=16 MAXNICKLEN=16 CHANNELLEN=50 TOPICLEN=390 "
+            ":are supported by this server",
+        f":{SERVER} 005 me DEAF=D TARGMAX=NAMES:1,LIST:1,KICK:1,WHOIS:1,"
+            "PRIVMSG:4,NOTICE:4,ACCEPT:,MONITOR: EXTBAN=$,ajrxz "
+            ":are supported by this server",
+        f":{SERVER} 251 me :There are 104 users and 26000 invisible",
+        f":{SERVER} 375 me :- {SERVER} Message of the Day -"
+    ]
+    lines += [f":{SERVER} 372 me :- motd line {i} " + "-"*40
+        for i in range(40)]
+    lines += [
+        f":{SERVER} 376 me :End of /MOTD command.",
+        f":me MODE me :+Ziw",
+        f":{SERVER} 900 me me!~me@bench/me me :You are now logged in as me"
+    ]
+    return [line.encode("utf8") for line in lines]
+
+def _join(channel: str, nicknames: List[str]) -> List[bytes]:
+    # our JOIN, the NAMES burst (userhost-in-names), end of NAMES
+    lines = [
+        f":me!~me@bench/me JOIN {channel} me :me",
+        f":{SERVER} 332 me {channel} :a topic for {channel}",
+        f":{SERVER} 333 me {channel} someone!~a@b 1600000000"
+    ]
+    names: List[str] = []
+    length = 0
+    for i, nickname in enumerate(nicknames):
+        prefix = "@" if i % 50 == 0 else ("+" if i % 10 == 0 else "")
+        name   = prefix + _hostmask(nickname, i)
+        if length + len(name) > 400:
+            lines.append(f":{SERVER} 353 me = {channel} :{' '.join(names)}")
+            names.clear()
+            length = 0
+        names.append(name)
+        length += len(name)+1
+    if names:
+        lines.append(f":{SERVER} 353 me = {channel} :{' '.join(names)}")
+    lines.append(f":{SERVER} 366 me {channel} :End of /NAMES list.")
+    return [line.encode("utf8") for line in lines]
+
+def corpus_registration(scale: float=1.0) -> Corpus:
+    return Corpus([], registration(), max(1, int(200*scale)))
+
+def corpus_names(scale: float=1.0) -> Corpus:
+    nicknames = _nicknames(int(10000*scale), random.Random(0))
+    return Corpus(registration(), _join("#big", nicknames), 5)
+
+def corpus_netsplit(scale: float=1.0) -> Corpus:
+    rand      = random.Random(1)
+    nicknames = _nicknames(int(10000*scale), rand)
+    channels  = ["#one", "#two", "#three"]
+
+    setup = registration()
+    for i, channel in enumerate(channels):
+        setup += _join(channel, nicknames[i*len(nicknames)//5:])
+
+    # a third of users split away, then come back
+    split = [(i, n) for i, n in enumerate(nicknames) if i % 3 == 0]
+    workload: List[bytes] = []
+    for i, nickname in split:
+        hostmask = _hostmask(nickname, i)
+        workload.append(
+            f":{hostmask} QUIT :*.net *.split".encode("utf8"))
+    for i, nickname in split:
+        hostmask = _hostmask(nickname, i)
+        for j, channel in enumerate(channels):
+            if i >= j*len(nicknames)//5:
+                workload.append(
+                    f":{hostmask} JOIN {channel} * :real name"
+                        .encode("utf8"))
+    return Corpus(setup, workload, 3)
+
+def corpus_privmsg(scale: float=1.0) -> Corpus:
+    rand      = random.Random(2)
+    nicknames = _nicknames(1000, rand)
+    strangers = _nicknames(200, rand)
+    setup     = registration() + _join("#chat", nicknames)
+
+    workload: List[bytes] = []
+    for i in range(int(50000*scale)):
+        if i % 20 == 0:
+            j = rand.randrange(len(strangers))
+            source, target = _hostmask(strangers[j], j), "me"
+        else:
+            j = rand.randrange(len(nicknames))
+            source, target = _hostmask(nicknames[j], j), "#chat"
+        command = "NOTICE" if i % 7 == 0 else "PRIVMSG"
+        text    = "hello " * rand.randint(1, 12)
+        workload.append(
+            f"@time=2020-01-01T00:00:00.000Z :{source} {command} {target} "
+            f":{text}".encode("utf8"))
+    return Corpus(setup, workload, 3)
+
+def corpus_mode(scale: float=1.0) -> Corpus:
+    rand      = random.Random(3)
+    nicknames = _nicknames(5000, rand)
+    setup     = registration() + _join("#modes", nicknames)
+
+    workload: List[bytes] = []
+    for i in range(int(10000*scale)):
+        kind = i % 4
+        if kind == 0:
+            targets = rand.sample(nicknames, 4)
+            line = f"+oooo {' '.join(targets)}"
+        elif kind == 1:
+            targets = rand.sample(nicknames, 4)
+            line = f"-vvvv {' '.join(targets)}"
+        elif kind == 2:
+            line = f"+bb *!*@bad{i}.example *!spam{i}@*"
+        else:
+            line = f"-b+l *!*@bad{i-1}.example {i}"
+        workload.append(
+            f":ChanServ!ChanServ@services.bench MODE #modes {line}"
+                .encode("utf8"))
+    return Corpus(setup, workload, 3)
+
+def corpus_whox(scale: float=1.0) -> Corpus:
+    rand      = random.Random(4)
+    nicknames = _nicknames(int(10000*scale), rand)
+    setup     = registration() + _join("#who", nicknames)
+
+    workload: List[bytes] = []
+    for i, nickname in enumerate(nicknames):
+        username, hostname = _hostmask(nickname, i).split("!")[1].split("@")
+        account = nickname if i % 2 else "0"
+        workload.append(
+            f":{SERVER} 354 me 735 #who {username} 10.0.{i//256%256}.{i%256} "
+            f"{hostname} {SERVER} {nickname} H {account} :real name {i}"
+                .encode("utf8"))
+    workload.append(f":{SERVER} 315 me #who :End of /WHO list.".encode("utf8"))
+    return Corpus(setup, workload, 3)
+
+CORPORA: Dict[str, Callable[[float], Corpus]] = {
+    "registration": corpus_registration,
+    "names":        corpus_names,
+    "netsplit":     corpus_netsplit,
+    "privmsg":      corpus_privmsg,
+    "mode":         corpus_mode,
+    "whox":         corpus_whox
+}
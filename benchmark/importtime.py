@@ -0,0 +1,29 @@
+import subprocess, sys
+from typing import Dict, List
+
+def measure(module: str="ircstates") -> Dict[str, int]:
+    # {imported module: cumulative microseconds}, from `python -X importtime`
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+
+    timings: Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        prefix, _, timing = line.partition(":")
+        if not prefix == "import time":
+            continue
+        _, cumulative, name = timing.split("|")
+        if cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+def main(argv: List[str]):
+    module  = argv[0] if argv else "ircstates"
+    timings = measure(module)
+    slowest = sorted(timings.items(), key=lambda t: t[1], reverse=True)
+    for name, cumulative in slowest[:15]:
+        print(f"{cumulative:>9}us {name}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
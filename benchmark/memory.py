@@ -0,0 +1,50 @@
+import sys, tracemalloc
+from typing import Dict, List
+import ircstates, irctokens
+from irctokens import Line
+
+def _names(channel: str, nicknames: List[str], chunk: int=40) -> List[Line]:
+    lines: List[Line] = []
+    for i in range(0, len(nicknames), chunk):
+        names = " ".join(
+            f"{n}!~{n}@user/{n}" for n in nicknames[i:i+chunk])
+        lines.append(irctokens.tokenise(f":server 353 me = {channel} :{names}"))
+    return lines
+
+def measure(user_count: int=20000, channel_count: int=4) -> Dict[str, float]:
+    nicknames = [f"user{i}" for i in range(user_count)]
+    server = ircstates.Server("bench")
+    server.parse_tokens(irctokens.tokenise(":server 001 me :hi"))
+
+    bursts: List[List[Line]] = []
+    for i in range(channel_count):
+        channel = f"#channel{i}"
+        burst   = [irctokens.tokenise(f":me!~me@host JOIN {channel}")]
+        bursts.append(burst + _names(channel, nicknames))
+
+    tracemalloc.start()
+    # first channel: creating the users and one membership each
+    base = tracemalloc.get_traced_memory()[0]
+    server.parse_lines(bursts[0], emits=False)
+    users = tracemalloc.get_traced_memory()[0]
+    # remaining channels: memberships only
+    for burst in bursts[1:]:
+        server.parse_lines(burst, emits=False)
+    memberships = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    membership_count = user_count * (channel_count-1)
+    return {
+        "users":                user_count,
+        "memberships":          membership_count,
+        "bytes_per_user":       (users-base) / user_count,
+        "bytes_per_membership": (memberships-users) / membership_count
+    }
+
+def main(argv: List[str]):
+    user_count = int(argv[0]) if argv else 20000
+    for key, value in measure(user_count).items():
+        print(f"{key:<22} {value:.1f}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
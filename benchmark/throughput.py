@@ -0,0 +1,164 @@
+import argparse, json, os, subprocess, sys, time
+from typing import Any, Dict, List, Optional
+import ircstates, irctokens
+from .corpus import CORPORA
+
+BASELINE  = os.path.join(os.path.dirname(__file__), "baseline.json")
+# lines/sec this far below baseline counts as a regression
+TOLERANCE = 0.2
+# bytes handed to each recv(), like reads off a socket
+CHUNK     = 4096
+
+def _chunks(lines: List[bytes]) -> List[bytes]:
+    data = b"".join(line + b"\r\n" for line in lines)
+    return [data[i:i+CHUNK] for i in range(0, len(data), CHUNK)]
+
+def _peak_rss() -> Optional[int]:
+    # kilobytes, None where `resource` isn't available
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macos, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _server(setup: List[bytes]) -> ircstates.Server:
+    server = ircstates.Server("bench")
+    for chunk in _chunks(setup):
+        server.recv_and_parse(chunk)
+    return server
+
+def run(name: str, scale: float=1.0) -> Dict[str, Any]:
+    corpus = CORPORA[name](scale)
+    chunks = _chunks(corpus.workload)
+
+    best: Optional[float] = None
+    for _ in range(corpus.rounds):
+        server = _server(corpus.setup)
+        start  = time.perf_counter()
+        for chunk in chunks:
+            server.recv_and_parse(chunk)
+        elapsed = time.perf_counter()-start
+        if best is None or elapsed < best:
+            best = elapsed
+    assert best is not None
+
+    # per-handler cost, one line at a time through parse_tokens
+    lines = [irctokens.tokenise(line.decode("utf8"))
+        for line in corpus.workload]
+    server  = _server(corpus.setup)
+    metrics = server.enable_metrics()
+    for line in lines:
+        server.parse_tokens(line)
+    calls, seconds = metrics.calls, metrics.seconds
+
+    return {
+        "lines":         len(corpus.workload),
+        "seconds":       best,
+        "lines_per_sec": len(corpus.workload) / best,
+        "peak_rss_kb":   _peak_rss(),
+        "handlers":      {
+            command: {
+                "calls":       count,
+                "us_per_call": seconds[command] / count * 1_000_000
+            } for command, count in calls.items()
+        }
+    }
+
+def run_isolated(name: str, scale: float=1.0) -> Dict[str, Any]:
+    # in its own process, so peak RSS is this corpus' alone
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmark.throughput",
+            "--child", "--scale", str(scale), name],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(process.stdout)
+
+def _load_baseline(scale: float) -> Dict[str, Any]:
+    if not os.path.exists(BASELINE):
+        return {}
+    with open(BASELINE) as baseline_file:
+        baseline = json.load(baseline_file)
+    # numbers from a different scale aren't comparable
+    if not baseline.get("scale") == scale:
+        return {}
+    return baseline.get("corpora", {})
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark.throughput")
+    parser.add_argument("corpora", nargs="*",
+        help=f"corpora to run, from {', '.join(CORPORA)} (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0,
+        help="multiply corpus sizes by this")
+    parser.add_argument("--save", action="store_true",
+        help="record results as the new baseline")
+    parser.add_argument("--check", action="store_true",
+        help="exit 1 if any corpus regressed against the baseline")
+    parser.add_argument("--child", action="store_true",
+        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    names = args.corpora or list(CORPORA)
+    for name in names:
+        if not name in CORPORA:
+            parser.error(f"unknown corpus {name!r}")
+    if args.child:
+        print(json.dumps(run(names[0], args.scale)))
+        return 0
+
+    baseline = _load_baseline(args.scale)
+    results: Dict[str, Dict[str, Any]] = {}
+    regressed: List[str] = []
+
+    print(f"{'corpus':<13} {'lines':>7} {'lines/s':>10} "
+        f"{'baseline':>10} {'change':>7} {'peak rss':>9}")
+    for name in names:
+        result = results[name] = run_isolated(name, args.scale)
+
+        change = ""
+        expected = baseline.get(name, {}).get("lines_per_sec", None)
+        if expected:
+            ratio  = result["lines_per_sec"] / expected
+            change = f"{(ratio-1)*100:+.0f}%"
+            if ratio < 1-TOLERANCE:
+                regressed.append(name)
+                change += "!"
+
+        rss = result["peak_rss_kb"]
+        print(f"{name:<13} {result['lines']:>7} "
+            f"{result['lines_per_sec']:>10.0f} "
+            f"{expected or 0:>10.0f} {change:>7} "
+            f"{'' if rss is None else f'{rss/1024:.1f}MB':>9}")
+
+    print()
+    print(f"{'corpus':<13} {'command':<10} {'calls':>7} {'us/call':>9}")
+    for name, result in results.items():
+        handlers = sorted(result["handlers"].items(),
+            key=lambda h: h[1]["calls"] * h[1]["us_per_call"], reverse=True)
+        for command, handler in handlers[:4]:
+            print(f"{name:<13} {command:<10} {handler['calls']:>7} "
+                f"{handler['us_per_call']:>9.2f}")
+
+    if args.save:
+        with open(BASELINE, "w") as baseline_file:
+            json.dump({
+                "scale":   args.scale,
+                "python":  sys.version.split(" ")[0],
+                "corpora": {
+                    name: {
+                        "lines_per_sec": round(result["lines_per_sec"]),
+                        "peak_rss_kb":   result["peak_rss_kb"]
+                    } for name, result in results.items()
+                }
+            }, baseline_file, indent=4)
+            baseline_file.write("\n")
+
+    if regressed:
+        print(f"\nregressed: {', '.join(regressed)}")
+        if args.check:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,5 +2,24 @@ from .server       import Server, ServerDisconnectedException
 from .user         import User
 from .channel      import Channel
 from .channel_user import ChannelUser
+from .list_mode    import ListModeEntry
 from .casemap      import casefold, CaseMap
+from .metrics      import Metrics
+from .string_pool  import StringPool
+from .user_cache   import UserCache
 from .emit         import *
+
+from typing import Any, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .snapshot   import SnapshotException
+    from .state_view import StateView
+
+def __getattr__(name: str) -> Any:
+    # these pull in mmap et al, so they're only imported once they're used
+    if name == "SnapshotException":
+        from .snapshot import SnapshotException
+        return SnapshotException
+    elif name == "StateView":
+        from .state_view import StateView
+        return StateView
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,14 @@
-from enum import Enum
-from string import ascii_lowercase, ascii_uppercase
-from typing import Dict, List, Optional
+from enum      import Enum
+from functools import lru_cache
+from string    import ascii_lowercase, ascii_uppercase
+from typing    import Callable, Dict, FrozenSet
 
 class CaseMap(Enum):
-    ASCII = "ascii"
-    RFC1459 = "rfc1459"
+    ASCII          = "ascii"
+    RFC1459        = "rfc1459"
+    RFC1459_STRICT = "rfc1459-strict"
 
-CASEMAPS: Dict[CaseMap, Dict[int, Optional[int]]] = {
+CASEMAPS: Dict[CaseMap, Dict[int, int]] = {
     CaseMap.ASCII: str.maketrans(
         r"ABCDEFGHIJKLMNOPQRSTUVWXYZ",
         r"abcdefghijklmnopqrstuvwxyz"
@@ -14,8 +16,40 @@ CASEMAPS: Dict[CaseMap, Dict[int, Optional[int]]] = {
     CaseMap.RFC1459: str.maketrans(
         r"ABCDEFGHIJKLMNOPQRSTUVWXYZ\[]^",
         r"abcdefghijklmnopqrstuvwxyz|{}~"
+    ),
+    CaseMap.RFC1459_STRICT: str.maketrans(
+        r"ABCDEFGHIJKLMNOPQRSTUVWXYZ\[]",
+        r"abcdefghijklmnopqrstuvwxyz|{}"
     )
 }
+
+CASEFOLD_CACHE_SIZE = 8192
+
+class CaseFolder(object):
+    def __init__(self,
+            casemap: CaseMap,
+            cache_size: int=CASEFOLD_CACHE_SIZE):
+        self.casemap = casemap
+        self._table  = CASEMAPS[casemap]
+        # characters this casemap folds that `str.lower()` doesn't
+        self._specials: FrozenSet[str] = frozenset(
+            chr(c) for c in self._table if not chr(c) in ascii_uppercase
+        )
+        self.fold: Callable[[str], str] = lru_cache(cache_size)(self._fold)
+
+    def __repr__(self) -> str:
+        return f"CaseFolder({self.casemap.value})"
+
+    def _fold(self, s: str) -> str:
+        if s.isascii():
+            s_lower = s.lower()
+            if self._specials.isdisjoint(s_lower):
+                return s_lower
+        return s.translate(self._table)
+
+CASEFOLDERS: Dict[CaseMap, CaseFolder] = {
+    casemap: CaseFolder(casemap) for casemap in CaseMap
+}
+
 def casefold(casemap_name: CaseMap, s: str):
-    casemap = CASEMAPS[casemap_name]
-    return s.translate(casemap)
+    return CASEFOLDERS[casemap_name].fold(s)
@@ -1,24 +1,42 @@
-from typing   import Dict, List, Optional, Set
-from pendulum import DateTime
+from datetime import datetime
+from typing   import Callable, Dict, Optional, Set
 
 from .channel_user import ChannelUser
+from .clock        import from_datetime, to_datetime
+from .list_mode    import ListModeEntry
+from .mask_match   import MaskMatcher
 from .names        import Name
+from .user         import User
 
 class Channel(object):
+    __slots__ = (
+        "_name", "users",
+        "topic", "topic_setter", "_topic_time", "_created",
+        "_list_modes_temp", "list_modes", "modes", "_mask_matchers",
+        "_names_temp"
+    )
+
     def __init__(self, name: Name):
         self._name = name
 
         self.users: Dict[str, ChannelUser] = {}
 
-        self.topic:        Optional[str]      = None
-        self.topic_setter: Optional[str]      = None
-        self.topic_time:   Optional[DateTime] = None
+        self.topic:        Optional[str]   = None
+        self.topic_setter: Optional[str]   = None
+        # epoch seconds; see the `topic_time`/`created` properties
+        self._topic_time:  Optional[float] = None
+        self._created:     Optional[float] = None
 
-        self.created:      Optional[DateTime] = None
+        # mode char -> {mask: ListModeEntry}, in the order masks were added
+        self._list_modes_temp: Dict[str, Dict[str, ListModeEntry]] = {}
+        self.list_modes:       Dict[str, Dict[str, ListModeEntry]] = {}
+        self.modes:            Dict[str, Optional[str]]            = {}
+        # built on first use by mask_matcher(), then kept up to date
+        self._mask_matchers:   Dict[str, MaskMatcher]              = {}
 
-        self._list_modes_temp: Dict[str, List[str]]     = {}
-        self.list_modes:       Dict[str, List[str]]     = {}
-        self.modes:            Dict[str, Optional[str]] = {}
+        # nicknames seen in an in-progress NAMES burst, mapped to their User
+        # if the burst is what added them to this channel
+        self._names_temp: Optional[Dict[str, Optional[User]]] = None
 
     def __repr__(self) -> str:
         return f"Channel(name={self.name!r})"
@@ -32,6 +50,20 @@ class Channel(object):
     def name_lower(self) -> str:
         return self._name.folded
 
+    @property
+    def topic_time(self) -> Optional[datetime]:
+        return to_datetime(self._topic_time)
+    @topic_time.setter
+    def topic_time(self, topic_time: Optional[datetime]):
+        self._topic_time = from_datetime(topic_time)
+
+    @property
+    def created(self) -> Optional[datetime]:
+        return to_datetime(self._created)
+    @created.setter
+    def created(self, created: Optional[datetime]):
+        self._created = from_datetime(created)
+
     def change_name(self,
             normal: str,
             folded: str):
@@ -41,13 +73,18 @@ class Channel(object):
     def add_mode(self,
             char: str,
             param: Optional[str],
-            list_mode: bool):
+            list_mode: bool,
+            setter: Optional[str]=None,
+            set_at: Optional[float]=None):
         if list_mode:
             if param is not None:
                 if not char in self.list_modes:
-                    self.list_modes[char] = []
-                if not param in self.list_modes[char]:
-                    self.list_modes[char].append(param)
+                    self.list_modes[char] = {}
+                mlist = self.list_modes[char]
+                if not param in mlist:
+                    mlist[param] = ListModeEntry(setter, set_at)
+                    if char in self._mask_matchers:
+                        self._mask_matchers[char].add(param)
         else:
             self.modes[char] = param
 
@@ -56,7 +93,23 @@ class Channel(object):
             param: Optional[str]):
         if char in self.list_modes:
             if (param is not None and
-                    param in self.list_modes[char]):
-                self.list_modes[char].remove(param)
+                    self.list_modes[char].pop(param, None) is not None and
+                    char in self._mask_matchers):
+                self._mask_matchers[char].remove(param)
         elif char in self.modes:
             del self.modes[char]
+
+    def set_list_mode(self,
+            char: str,
+            entries: Dict[str, ListModeEntry]):
+        self.list_modes[char] = entries
+        self._mask_matchers.pop(char, None)
+
+    def mask_matcher(self,
+            char: str,
+            casefold: Callable[[str], str]) -> MaskMatcher:
+        matcher = self._mask_matchers.get(char, None)
+        if matcher is None or not matcher.casefold is casefold:
+            matcher = MaskMatcher(casefold, self.list_modes.get(char, {}))
+            self._mask_matchers[char] = matcher
+        return matcher
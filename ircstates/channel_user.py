@@ -1,17 +1,27 @@
-from typing   import List, Optional, Set
-from .names   import Name
-from pendulum import DateTime, now
+from datetime import datetime
+from typing   import List, Optional, Set, TYPE_CHECKING
+from .clock   import from_datetime, to_datetime, wall_clock
+
+if TYPE_CHECKING:
+    from .channel import Channel
+    from .user    import User
 
 class ChannelUser(object):
+    # points at its User and Channel (in place of their Names, so no bigger
+    # than before) so a user's memberships can be walked without lookups
+    __slots__ = ("_user", "_channel", "modes", "_since", "_joined")
+
     def __init__(self,
-            nickname: Name,
-            channel_name: Name):
-        self._nickname     = nickname
-        self._channel_name = channel_name
+            user:    "User",
+            channel: "Channel",
+            since:   Optional[float]=None):
+        self._user    = user
+        self._channel = channel
 
-        self.modes:  Set[str] = set()
-        self.since = now("utc")
-        self.joined: Optional[DateTime] = None
+        self.modes:   Set[str]        = set()
+        # epoch seconds; `since`/`joined` turn these into datetimes on read
+        self._since:  float           = wall_clock() if since is None else since
+        self._joined: Optional[float] = None
 
     def __repr__(self) -> str:
         outs: List[str] = [self.channel, self.nickname]
@@ -19,13 +29,33 @@ class ChannelUser(object):
             outs.append(f"+{''.join(self.modes)}")
         return f"ChannelUser({' '.join(outs)})"
 
+    def get_user(self) -> "User":
+        return self._user
+    def get_channel(self) -> "Channel":
+        return self._channel
+
     @property
     def nickname(self) -> str:
-        return self._nickname.normal
+        return self._user.nickname
     @property
     def nickname_lower(self) -> str:
-        return self._nickname.folded
+        return self._user.nickname_lower
 
     @property
     def channel(self) -> str:
-        return self._channel_name.normal
+        return self._channel.name
+
+    @property
+    def since(self) -> datetime:
+        return to_datetime(self._since)
+    @since.setter
+    def since(self, since: datetime):
+        epoch = from_datetime(since)
+        assert epoch is not None
+        self._since = epoch
+    @property
+    def joined(self) -> Optional[datetime]:
+        return to_datetime(self._joined)
+    @joined.setter
+    def joined(self, joined: Optional[datetime]):
+        self._joined = from_datetime(joined)
@@ -0,0 +1,39 @@
+import time
+from datetime import datetime, timezone
+from typing   import Callable, Optional, overload
+
+TYPE_CLOCK = Callable[[], float]
+
+def wall_clock() -> float:
+    # looked up on each call so patched clocks (e.g. freezegun) are seen
+    return time.time()
+
+def _datetime_from_timestamp(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+_from_timestamp: Optional[Callable[[float], datetime]] = None
+def _load_from_timestamp() -> Callable[[float], datetime]:
+    # pendulum is optional and slow to import, so only load it the first
+    # time a timestamp is turned into a datetime
+    try:
+        from pendulum import from_timestamp
+    except ImportError:
+        return _datetime_from_timestamp
+    return from_timestamp
+
+@overload
+def to_datetime(timestamp: float) -> datetime: ...
+@overload
+def to_datetime(timestamp: Optional[float]) -> Optional[datetime]: ...
+def to_datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    global _from_timestamp
+    if timestamp is None:
+        return None
+    elif _from_timestamp is None:
+        _from_timestamp = _load_from_timestamp()
+    return _from_timestamp(timestamp)
+
+def from_datetime(dt: Optional[datetime]) -> Optional[float]:
+    if dt is None:
+        return None
+    return dt.timestamp()
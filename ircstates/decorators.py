@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 
 def handler_decorator(d: Dict[str, List[Any]]):
     def _handler(command: str):
@@ -9,3 +9,26 @@ def handler_decorator(d: Dict[str, List[Any]]):
             return func
         return _
     return _handler
+
+def _fuse_handlers(funcs: List[Callable[[Any, Any], Any]]
+        ) -> Callable[[Any, Any], Any]:
+    def _fused(self: Any, line: Any) -> Any:
+        ret = None
+        for func in funcs:
+            emit = func(self, line)
+            if ret is None:
+                ret = emit
+        return ret
+    return _fused
+
+def compile_handlers(cls: Any, d: Dict[str, List[Any]]
+        ) -> Dict[str, Callable[[Any, Any], Any]]:
+    compiled: Dict[str, Callable[[Any, Any], Any]] = {}
+    for command, funcs in d.items():
+        # look handlers up by name on `cls` so subclass overrides win
+        resolved = [getattr(cls, f.__name__, f) for f in funcs]
+        if len(resolved) == 1:
+            compiled[command] = resolved[0]
+        else:
+            compiled[command] = _fuse_handlers(resolved)
+    return compiled
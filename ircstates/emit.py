@@ -1,28 +1,76 @@
-from typing import List, Optional
+from typing import FrozenSet, List, Optional, Tuple
 from .user import User
 from .channel import Channel
 
 class Emit(object):
-    command:    Optional[str] = None
-    subcommand: Optional[str] = None
+    __slots__ = (
+        "command", "subcommand",
+        "text", "_tokens", "_mode_tokens",
+        "finished",
+        "self", "self_source", "self_target",
+        "user", "user_source", "user_target",
+        "users", "users_added", "users_removed",
+        "channel", "channel_source", "channel_target",
+        "target"
+    )
 
-    text:   Optional[str]       = None
-    tokens: Optional[List[str]] = None
+    command:    Optional[str]
+    subcommand: Optional[str]
 
-    finished: Optional[bool] = None
+    text:         Optional[str]
+    _tokens:      Optional[List[str]]
+    _mode_tokens: Optional[List[Tuple[str, Optional[str]]]]
 
-    self:        Optional[bool] = None
-    self_source: Optional[bool] = None
-    self_target: Optional[bool] = None
+    finished: Optional[bool]
 
-    user:        Optional[User] = None
-    user_source: Optional[User] = None
-    user_target: Optional[User] = None
+    self:        Optional[bool]
+    self_source: Optional[bool]
+    self_target: Optional[bool]
 
-    users: Optional[List[User]] = None
+    user:        Optional[User]
+    user_source: Optional[User]
+    user_target: Optional[User]
 
-    channel:        Optional[Channel] = None
-    channel_source: Optional[Channel] = None
-    channel_target: Optional[Channel] = None
+    users:         Optional[List[User]]
+    users_added:   Optional[List[User]]
+    users_removed: Optional[List[User]]
 
-    target: Optional[str] = None
+    channel:        Optional[Channel]
+    channel_source: Optional[Channel]
+    channel_target: Optional[Channel]
+
+    target: Optional[str]
+
+    def _clear(self):
+        # let go of users and channels, so a reused Emit doesn't keep
+        # them alive
+        for name in _EMIT_REFS:
+            setattr(self, name, None)
+
+    def __getattr__(self, name: str) -> None:
+        # slots that were never assigned read as None
+        if name in _EMIT_SLOTS:
+            return None
+        raise AttributeError(name)
+
+    @property
+    def tokens(self) -> Optional[List[str]]:
+        if self._tokens is None and self._mode_tokens is not None:
+            tokens: List[str] = []
+            for mode, arg in self._mode_tokens:
+                if arg is not None:
+                    tokens.append(f"{mode} {arg}")
+                else:
+                    tokens.append(mode)
+            self._tokens = tokens
+        return self._tokens
+    @tokens.setter
+    def tokens(self, tokens: Optional[List[str]]):
+        self._tokens = tokens
+
+_EMIT_SLOTS: FrozenSet[str] = frozenset(Emit.__slots__)
+_EMIT_REFS:  Tuple[str, ...] = (
+    "user", "user_source", "user_target",
+    "users", "users_added", "users_removed",
+    "channel", "channel_source", "channel_target"
+)
@@ -1,8 +1,10 @@
 from typing import Dict, List, Optional
-from .tokens import ChanModes, Prefix
+from .tokens import ChanModes, Prefix, TYPE_MODE, compile_chanmodes
+from .tokens import (MODE_PREFIX, MODE_LIST, MODE_PARAM, MODE_SET, MODE_FLAG,
+    MODE_UNKNOWN)
 from ..casemap import CaseMap
 
-CASEMAPPINGS = ["rfc1459", "ascii"]
+CASEMAPPINGS = ["rfc1459", "rfc1459-strict", "ascii"]
 
 def _parse_escapes(s: str):
     idx = 0
@@ -47,6 +49,8 @@ class ISupport(object):
 
     def __init__(self):
         self.raw = {}
+        self.chanmode_table: Dict[str, TYPE_MODE] = compile_chanmodes(
+            self.chanmodes, self.prefix)
 
     def from_tokens(self, tokens: List[str]):
         for token in tokens:
@@ -60,10 +64,14 @@ class ISupport(object):
             elif key == "CHANMODES":
                 a, b, c, d = value.split(",")
                 self.chanmodes = ChanModes(list(a), list(b), list(c), list(d))
+                self.chanmode_table = compile_chanmodes(
+                    self.chanmodes, self.prefix)
 
             elif key == "PREFIX":
                 modes, prefixes = value[1:].split(")")
                 self.prefix = Prefix(list(modes), list(prefixes))
+                self.chanmode_table = compile_chanmodes(
+                    self.chanmodes, self.prefix)
 
             elif key == "STATUSMSG":
                 self.statusmsg = list(value)
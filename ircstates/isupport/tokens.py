@@ -1,4 +1,15 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+# channel mode kinds, see ISupport.chanmode_table
+MODE_PREFIX = 0 # a user's status, always has a param
+MODE_LIST   = 1 # CHANMODES type A, always has a param
+MODE_PARAM  = 2 # CHANMODES type B, always has a param
+MODE_SET    = 3 # CHANMODES type C, only has a param when set
+MODE_FLAG   = 4 # CHANMODES type D, never has a param
+
+# (kind, has param when set, has param when unset)
+TYPE_MODE = Tuple[int, bool, bool]
+MODE_UNKNOWN: TYPE_MODE = (MODE_FLAG, False, False)
 
 class ChanModes(object):
     def __init__(self,
@@ -18,11 +29,28 @@ class Prefix(object):
         self.modes    = modes
         self.prefixes = prefixes
 
+        self.mode_prefixes: Dict[str, str] = dict(zip(modes, prefixes))
+        self.prefix_modes:  Dict[str, str] = dict(zip(prefixes, modes))
+
     def from_mode(self, mode: str) -> Optional[str]:
-        if mode in self.modes:
-            return self.prefixes[self.modes.index(mode)]
-        return None
+        return self.mode_prefixes.get(mode, None)
     def from_prefix(self, prefix: str) -> Optional[str]:
-        if prefix in self.prefixes:
-            return self.modes[self.prefixes.index(prefix)]
-        return None
+        return self.prefix_modes.get(prefix, None)
+
+def compile_chanmodes(
+        chanmodes: ChanModes,
+        prefix:    Prefix
+        ) -> Dict[str, TYPE_MODE]:
+    table: Dict[str, TYPE_MODE] = {}
+    # lowest precedence first so that e.g. a PREFIX mode wins over CHANMODES
+    for char in chanmodes.d_modes:
+        table[char] = (MODE_FLAG,   False, False)
+    for char in chanmodes.c_modes:
+        table[char] = (MODE_SET,    True,  False)
+    for char in chanmodes.b_modes:
+        table[char] = (MODE_PARAM,  True,  True)
+    for char in chanmodes.a_modes:
+        table[char] = (MODE_LIST,   True,  True)
+    for char in prefix.modes:
+        table[char] = (MODE_PREFIX, True,  True)
+    return table
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing   import Optional
+from .clock   import to_datetime
+
+class ListModeEntry(object):
+    __slots__ = ("setter", "_set_at")
+
+    def __init__(self,
+            setter: Optional[str],
+            set_at: Optional[float]):
+        self.setter  = setter
+        self._set_at = set_at
+
+    def __repr__(self) -> str:
+        return f"ListModeEntry(setter={self.setter!r}, set_at={self.set_at!r})"
+
+    @property
+    def set_at(self) -> Optional[datetime]:
+        return to_datetime(self._set_at)
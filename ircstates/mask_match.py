@@ -0,0 +1,217 @@
+import re
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+    Pattern, Tuple)
+
+def _glob(glob: str) -> Pattern:
+    # IRC globs: "*" is any run of characters, "?" is any one character
+    regex: List[str] = []
+    for char in glob:
+        if char == "*":
+            regex.append(".*")
+        elif char == "?":
+            regex.append(".")
+        else:
+            regex.append(re.escape(char))
+    return re.compile("".join(regex), re.DOTALL)
+
+def _combine(patterns: Iterable[Optional[Pattern]]) -> Pattern:
+    return re.compile(
+        "|".join(f"(?:{p.pattern})" for p in patterns if p is not None),
+        re.DOTALL
+    )
+
+def _is_literal(s: str) -> bool:
+    return not ("*" in s or "?" in s)
+
+def normalise_mask(mask: str) -> Optional[str]:
+    # None for extbans ($a:account, r:gecos, ~q:nick!*@* ..) which don't
+    # match against a nick!user@host
+    if mask.startswith("$"):
+        return None
+    head, _, _ = mask.partition("@")
+    head, _, _ = head.partition("!")
+    if ":" in head:
+        return None
+
+    if "@" in mask:
+        nickuser, _, host = mask.rpartition("@")
+        if not "!" in nickuser:
+            nickuser = f"*!{nickuser}"
+    elif "!" in mask:
+        nickuser, host = mask, "*"
+    else:
+        nickuser, host = f"{mask}!*", "*"
+    return f"{nickuser}@{host}"
+
+class _Bucket(object):
+    # masks that share a host (or host suffix), keyed by their nick!user glob
+    __slots__ = ("patterns", "wildcards", "_combined")
+
+    def __init__(self):
+        # mask -> compiled nick!user glob, None if it's "*!*"
+        self.patterns:  Dict[str, Optional[Pattern]] = {}
+        self.wildcards: int = 0
+        self._combined: Optional[Pattern] = None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def add(self, mask: str, pattern: Optional[Pattern]):
+        if not mask in self.patterns:
+            self.patterns[mask] = pattern
+            if pattern is None:
+                self.wildcards += 1
+            self._combined = None
+    def remove(self, mask: str):
+        if mask in self.patterns:
+            if self.patterns.pop(mask) is None:
+                self.wildcards -= 1
+            self._combined = None
+
+    def match(self, nickuser: str) -> Iterator[str]:
+        for mask, pattern in self.patterns.items():
+            if pattern is None or pattern.fullmatch(nickuser):
+                yield mask
+
+    def matches(self, nickuser: str) -> bool:
+        if self.wildcards:
+            return True
+        elif not self.patterns:
+            return False
+        elif self._combined is None:
+            self._combined = _combine(self.patterns.values())
+        return self._combined.fullmatch(nickuser) is not None
+
+class MaskMatcher(object):
+    def __init__(self,
+            casefold: Callable[[str], str],
+            masks:    Iterable[str]=()):
+        self.casefold = casefold
+
+        # folded literal host -> masks with that host
+        self._exact:  Dict[str, _Bucket] = {}
+        # folded ".domain" -> masks with a "*.domain" host
+        self._suffix: Dict[str, _Bucket] = {}
+        # masks whose host is "*"
+        self._any = _Bucket()
+        # anything else, matched as a whole nick!user@host
+        self._fallback: Dict[str, Pattern] = {}
+        self._fallback_any: Optional[Pattern] = None
+
+        for mask in masks:
+            self.add(mask)
+
+    def __len__(self) -> int:
+        count = len(self._any) + len(self._fallback)
+        for bucket in self._exact.values():
+            count += len(bucket)
+        for bucket in self._suffix.values():
+            count += len(bucket)
+        return count
+
+    def _index(self, host: str
+            ) -> Tuple[Optional[Dict[str, _Bucket]], str]:
+        # the index a (not "*") host's bucket goes in, and its key there
+        if _is_literal(host):
+            return self._exact, host
+        elif host.startswith("*.") and _is_literal(host[1:]):
+            return self._suffix, host[1:]
+        return None, host
+
+    def _bucket(self, host: str) -> Optional[_Bucket]:
+        if host == "*":
+            return self._any
+
+        index, key = self._index(host)
+        if index is None:
+            return None
+        elif not key in index:
+            index[key] = _Bucket()
+        return index[key]
+
+    def add(self, mask: str):
+        normal = normalise_mask(mask)
+        if normal is None:
+            return
+        folded = self.casefold(normal)
+        nickuser, _, host = folded.rpartition("@")
+
+        bucket = self._bucket(host)
+        if bucket is not None:
+            pattern: Optional[Pattern] = None
+            if not nickuser in ("*!*", "*"):
+                pattern = _glob(nickuser)
+            bucket.add(mask, pattern)
+        else:
+            self._fallback[mask] = _glob(folded)
+            self._fallback_any   = None
+
+    def remove(self, mask: str):
+        normal = normalise_mask(mask)
+        if normal is None:
+            return
+        host = self.casefold(normal).rpartition("@")[2]
+
+        if host == "*":
+            self._any.remove(mask)
+            return
+
+        index, key = self._index(host)
+        if index is not None:
+            if key in index:
+                bucket = index[key]
+                bucket.remove(mask)
+                # hosts come and go; don't keep a bucket for each forever
+                if not bucket:
+                    del index[key]
+        elif self._fallback.pop(mask, None) is not None:
+            self._fallback_any = None
+
+    def _buckets(self, host: str) -> Iterator[_Bucket]:
+        if self._any:
+            yield self._any
+        if host in self._exact:
+            yield self._exact[host]
+        if self._suffix:
+            dot = host.find(".")
+            while not dot == -1:
+                suffix = host[dot:]
+                if suffix in self._suffix:
+                    yield self._suffix[suffix]
+                dot = host.find(".", dot+1)
+
+    def match(self,
+            nickname: str,
+            username: Optional[str],
+            hostname: Optional[str]) -> List[str]:
+        nickuser = self.casefold(f"{nickname}!{username or ''}")
+        host     = self.casefold(hostname or "")
+
+        masks: List[str] = []
+        for bucket in self._buckets(host):
+            masks.extend(bucket.match(nickuser))
+
+        if self._fallback:
+            hostmask = f"{nickuser}@{host}"
+            for mask, pattern in self._fallback.items():
+                if pattern.fullmatch(hostmask):
+                    masks.append(mask)
+        return masks
+
+    def matches(self,
+            nickname: str,
+            username: Optional[str],
+            hostname: Optional[str]) -> bool:
+        nickuser = self.casefold(f"{nickname}!{username or ''}")
+        host     = self.casefold(hostname or "")
+
+        for bucket in self._buckets(host):
+            if bucket.matches(nickuser):
+                return True
+
+        if self._fallback:
+            if self._fallback_any is None:
+                self._fallback_any = _combine(self._fallback.values())
+            return self._fallback_any.fullmatch(
+                f"{nickuser}@{host}") is not None
+        return False
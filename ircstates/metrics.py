@@ -0,0 +1,49 @@
+from typing import Any, Callable, Dict, Optional
+
+# called with (command, lines, seconds) as each line, or fused run of lines,
+# is handled
+TYPE_METRICS_CALLBACK = Callable[[str, int, float], None]
+
+class Metrics(object):
+    def __init__(self, callback: Optional[TYPE_METRICS_CALLBACK]=None):
+        self.callback = callback
+        self.reset()
+
+    def __repr__(self) -> str:
+        return f"Metrics(lines={self.lines})"
+
+    def reset(self):
+        self.lines = 0
+        self.calls:       Dict[str, int]   = {}
+        self.seconds:     Dict[str, float] = {}
+        self.max_seconds: Dict[str, float] = {}
+
+    def record(self, command: str, lines: int, seconds: float):
+        self.lines += lines
+        if command in self.calls:
+            self.calls[command]   += lines
+            self.seconds[command] += seconds
+        else:
+            self.calls[command]   = lines
+            self.seconds[command] = seconds
+            self.max_seconds[command] = 0.0
+
+        # a fused run only tells us its average
+        per_line = seconds / lines
+        if per_line > self.max_seconds[command]:
+            self.max_seconds[command] = per_line
+
+        if self.callback is not None:
+            self.callback(command, lines, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "lines":    self.lines,
+            "commands": {
+                command: {
+                    "calls":       calls,
+                    "seconds":     self.seconds[command],
+                    "max_seconds": self.max_seconds[command]
+                } for command, calls in self.calls.items()
+            }
+        }
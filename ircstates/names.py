@@ -1,5 +1,7 @@
 
 class Name(object):
+    __slots__ = ("normal", "folded")
+
     def __init__(self,
             normal: str,
             folded: str):
@@ -1,22 +1,35 @@
-from ipaddress import ip_address
-from typing    import Callable, Dict, List, Optional, Set, Tuple
+from collections import deque
+from functools   import lru_cache
+from time        import perf_counter
+from typing    import (Any, BinaryIO, Callable, Deque, Dict, List, Optional,
+    Set, Tuple)
 from irctokens import Line, build, Hostmask, StatefulDecoder, StatefulEncoder
 from irctokens import hostmask as hostmask_
-from pendulum  import from_timestamp, now
 
 from .user         import User
 from .channel      import Channel
 from .channel_user import ChannelUser
-from .isupport     import ISupport
-from .decorators   import handler_decorator
-from .casemap      import casefold
+from .clock        import TYPE_CLOCK, wall_clock
+from .list_mode    import ListModeEntry
+from .isupport     import ISupport, MODE_LIST, MODE_PREFIX, MODE_UNKNOWN
+from .decorators   import handler_decorator, compile_handlers
+from .casemap      import CASEFOLDERS
 from .names        import Name
+from .metrics      import Metrics, TYPE_METRICS_CALLBACK
+from .string_pool  import StringPool
+from .user_cache   import UserCache
 from .emit         import *
 from .numerics     import *
 
 LINE_HANDLERS: Dict[str, List[Callable[["Server", Line], Emit]]] = {}
 line_handler = handler_decorator(LINE_HANDLERS)
 
+@lru_cache(1)
+def _ip_address() -> Callable[[str], Any]:
+    # `ipaddress` is slow to import and only WHOX needs it
+    from ipaddress import ip_address
+    return ip_address
+
 class ServerException(Exception):
     pass
 class ServerDisconnectedException(ServerException):
@@ -25,7 +38,33 @@ class ServerDisconnectedException(ServerException):
 WHO_TYPE = "735" # randomly generated
 TYPE_EMIT = Optional[Emit]
 
+# how many netsplit QUITs we remember, to spot the matching netjoin
+NETSPLIT_MEMORY = 16384
+# JOINs from split users up to this many seconds after their split are
+# taken to be the netjoin
+NETJOIN_WINDOW  = 300.0
+
+# rough bytes held per object for Server.stats(), from benchmark.memory and
+# tracemalloc on CPython 3.11 (strings included)
+USER_BYTES       = 1000
+MEMBERSHIP_BYTES = 420
+CHANNEL_BYTES    = 970
+LIST_MODE_BYTES  = 160
+
+def _is_netsplit(reason: str) -> bool:
+    # "server1.example server2.example", or "*.net *.split" when hidden
+    servers = reason.split(" ")
+    return (len(servers) == 2 and
+        all("." in server for server in servers))
+
 class Server(object):
+    # command -> single callable, built from LINE_HANDLERS per class
+    _line_handlers: Dict[str, Callable[["Server", Line], TYPE_EMIT]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._line_handlers = compile_handlers(cls, LINE_HANDLERS)
+
     def __init__(self, name: str):
         self.name = name
 
@@ -39,6 +78,10 @@ class Server(object):
         self.away:     Optional[str] = None
         self.ip:       Optional[str] = None
 
+        # epoch seconds for join/topic/list mode times; swap for a fake
+        # clock to replay or benchmark
+        self.clock: TYPE_CLOCK = wall_clock
+
         self.registered = False
         self.modes: Set[str] = set()
         self.motd:  List[str] = []
@@ -47,14 +90,49 @@ class Server(object):
 
         self.users:    Dict[str, User]    = {}
         self.channels: Dict[str, Channel] = {}
+        # kept up to date as they change, for stats(). memberships counts
+        # User->ChannelUser links, so includes channels still in teardown
+        self._memberships       = 0
+        self._list_mode_entries = 0
+
+        # nickname_lower -> (nickname, netsplit reason, time of the split),
+        # oldest split first
+        self._split_users: Dict[str, Tuple[str, str, float]] = {}
+
+        # members of channels we've left, who may now share no channel with
+        # us. they lose the channel straight away, but until they're
+        # checked they stay in `users` (with no channels) - each parsed line
+        # checks up to `teardown_chunk` of them; collect() does the rest
+        self._teardown: Deque[List[User]] = deque()
+        self.teardown_chunk: int = 1000
 
         self.isupport = ISupport()
+        self._casefold_map = self.isupport.casemapping
+        self._casefold     = CASEFOLDERS[self._casefold_map].fold
+
+        # set to a StringPool to share repeated username/hostname/server/
+        # account/realname strings between users
+        self.string_pool: Optional[StringPool] = None
+        # set to a UserCache to keep users who quit, leave our last shared
+        # channel or message us from outside our channels, and pick their
+        # details back up when we see them again
+        self.user_cache: Optional[UserCache] = None
 
         self.has_cap: bool = False
         self._temp_caps:     Dict[str, str] = {}
         self.available_caps: Dict[str, str] = {}
         self.agreed_caps:    List[str]      = []
 
+        # set to False to update state without building Emit objects
+        self.emits: bool = True
+        self._null_emit = Emit()
+        # set to True to have parse_lines() collapse a burst of JOINs into
+        # one Emit per channel, with the joining users in Emit.users
+        self.aggregate_joins: bool = False
+
+        # see enable_metrics()
+        self.metrics: Optional[Metrics] = None
+
     def __repr__(self) -> str:
         return f"Server(name={self.name!r})"
 
@@ -64,18 +142,151 @@ class Server(object):
             raise ServerDisconnectedException()
         return lines
 
+    def parse_lines(self,
+            lines: List[Line],
+            emits: bool=True
+            ) -> List[Tuple[Line, TYPE_EMIT]]:
+        emits_before = self.emits
+        if not emits:
+            self.emits = False
+        try:
+            return self._parse_lines(lines)
+        finally:
+            self.emits = emits_before
+            # fused runs don't go through parse_tokens()
+            self._null_emit._clear()
+
+    def _parse_lines(self, lines: List[Line]) -> List[Tuple[Line, TYPE_EMIT]]:
+        parsed: List[Tuple[Line, TYPE_EMIT]] = []
+        parse_tokens = self.parse_tokens
+        metrics      = self.metrics
+        # only fuse lines when the handler hasn't been overridden
+        fuse_quit = self._line_handlers.get("QUIT") is Server._handle_quit
+        fuse_join = self._line_handlers.get("JOIN") is Server._handle_JOIN
+
+        i, count = 0, len(lines)
+        while i < count:
+            line = lines[i]
+            if fuse_quit and line.command == "QUIT":
+                end = self._netsplit_end(lines, i)
+                if end-i > 1:
+                    if metrics is not None:
+                        start = perf_counter()
+                    parsed.extend(self._netsplit(lines[i:end]))
+                    self._fused_collect(end-i)
+                    if metrics is not None:
+                        metrics.record("QUIT", end-i, perf_counter()-start)
+                    i = end
+                    continue
+            elif (fuse_join and
+                    line.command == "JOIN" and
+                    i+1 < count and
+                    lines[i+1].command == "JOIN"):
+                if metrics is not None:
+                    start = perf_counter()
+                end = self._join_burst(lines, i, parsed)
+                if end > i:
+                    self._fused_collect(end-i)
+                    if metrics is not None:
+                        metrics.record("JOIN", end-i, perf_counter()-start)
+                    i = end
+                    continue
+            parsed.append((line, parse_tokens(line)))
+            i += 1
+        return parsed
+
+    def _fused_collect(self, lines: int):
+        # keep deferred teardown going at the pace parse_tokens() would
+        # have, a chunk per line
+        if self._teardown:
+            self.collect(self.teardown_chunk*lines)
+
+    def recv_and_parse(self,
+            data: bytes,
+            emits: bool=True
+            ) -> List[Tuple[Line, TYPE_EMIT]]:
+        return self.parse_lines(self.recv(data), emits)
+
+    def enable_metrics(self,
+            callback: Optional[TYPE_METRICS_CALLBACK]=None) -> Metrics:
+        # time every line per command. this swaps in a timed parse_tokens
+        # on this instance, so there's no cost at all while disabled
+        self.disable_metrics()
+        metrics = self.metrics = Metrics(callback)
+        record       = metrics.record
+        parse_tokens = self.parse_tokens
+
+        def timed_parse_tokens(line: Line) -> TYPE_EMIT:
+            start = perf_counter()
+            emit  = parse_tokens(line)
+            record(line.command, 1, perf_counter()-start)
+            return emit
+        # shadows the method; mypy won't allow assigning to it directly
+        setattr(self, "parse_tokens", timed_parse_tokens)
+        return metrics
+    def disable_metrics(self):
+        self.metrics = None
+        self.__dict__.pop("parse_tokens", None)
+
+    def stats(self) -> Dict[str, int]:
+        users    = len(self.users)
+        channels = len(self.channels)
+        return {
+            "users":             users,
+            "channels":          channels,
+            "memberships":       self._memberships,
+            "list_mode_entries": self._list_mode_entries,
+            "available_caps":    len(self.available_caps),
+            "agreed_caps":       len(self.agreed_caps),
+            "isupport_tokens":   len(self.isupport.raw),
+            "bytes": (
+                users                   * USER_BYTES +
+                channels                * CHANNEL_BYTES +
+                self._memberships       * MEMBERSHIP_BYTES +
+                self._list_mode_entries * LIST_MODE_BYTES
+            )
+        }
+
+    def snapshot(self, fp: BinaryIO):
+        # write our state to `fp`, for restore() after a restart
+        from . import snapshot
+        snapshot.write(self, fp)
+    def restore(self, fp: BinaryIO):
+        # replace our state with a snapshot() read from `fp`; see
+        # snapshot.read() for what's left when that fails
+        from . import snapshot
+        snapshot.read(self, fp)
+    def export(self, fp: BinaryIO):
+        # write our state to `fp` for StateView, e.g. to share with workers
+        from . import state_view
+        state_view.write(self, fp)
+
     def parse_tokens(self, line: Line) -> TYPE_EMIT:
-        ret_emit: TYPE_EMIT = None
-        if line.command in LINE_HANDLERS:
-            for callback in LINE_HANDLERS[line.command]:
-                emit = callback(self, line)
-                if emit is not None and ret_emit is None:
-                    emit.command = line.command
-                    ret_emit = emit
-        return ret_emit
-
-    def casefold(self, s1: str):
-        return casefold(self.isupport.casemapping, s1)
+        if self._teardown:
+            self.collect(self.teardown_chunk)
+
+        handler = self._line_handlers.get(line.command)
+        if handler is None:
+            return None
+        emit = handler(self, line)
+        if emit is None or not self.emits:
+            if emit is self._null_emit:
+                emit._clear()
+            return None
+        emit.command = line.command
+        return emit
+
+    def _current_casefold(self) -> Callable[[str], str]:
+        casemapping = self.isupport.casemapping
+        if not casemapping is self._casefold_map:
+            # CASEMAPPING changed; switch to that casemap's folder and cache
+            self._casefold_map = casemapping
+            self._casefold     = CASEFOLDERS[casemapping].fold
+        return self._casefold
+    def casefold(self, s1: str) -> str:
+        if not self.isupport.casemapping is self._casefold_map:
+            self._current_casefold()
+        return self._casefold(s1)
     def casefold_equals(self, s1: str, s2: str):
         return self.casefold(s1) == self.casefold(s2)
     def is_me(self, nickname: str):
@@ -83,9 +294,47 @@ class Server(object):
 
     def has_user(self, nickname: str) -> bool:
         return self.casefold(nickname) in self.users
-    def _add_user(self, nickname: str, nickname_lower: str):
-        user = self.create_user(Name(nickname, nickname_lower))
+    def _add_user(self,
+            nickname:       str,
+            nickname_lower: str,
+            username:       Optional[str]=None,
+            hostname:       Optional[str]=None) -> User:
+        user: Optional[User] = None
+        if self.user_cache is not None:
+            user = self.user_cache.take(nickname_lower, username, hostname)
+        if user is None:
+            user = self.create_user(Name(nickname, nickname_lower))
+        else:
+            user.change_nickname(nickname, nickname_lower)
+            # a QUIT's emit may still be looking at the old memberships
+            user._channels = {}
         self.users[nickname_lower] = user
+        return user
+    def _off_channel_user(self,
+            nickname:       str,
+            nickname_lower: str,
+            username:       Optional[str]=None,
+            hostname:       Optional[str]=None) -> User:
+        # someone who isn't in any of our channels
+        cache = self.user_cache
+        if cache is not None:
+            user = cache.get(nickname_lower, username, hostname)
+            if user is not None:
+                user.change_nickname(nickname, nickname_lower)
+                user._channels = {}
+                return user
+
+        user = self.create_user(Name(nickname, nickname_lower))
+        user.username = self._intern(username)
+        user.hostname = self._intern(hostname)
+        if cache is not None:
+            cache.add(user)
+        return user
+    def _release_user(self, user: User):
+        # `user` is no longer in any channel we're in
+        del self.users[user.nickname_lower]
+        if self.user_cache is not None:
+            self.user_cache.add(user)
 
     def is_channel(self, target: str) -> bool:
         return target[:1] in self.isupport.chantypes
@@ -94,24 +343,116 @@ class Server(object):
     def get_channel(self, name: str) -> Optional[Channel]:
         return self.channels.get(self.casefold(name), None)
 
+    def list_mode_matches(self,
+            channel: Channel,
+            mode: str="b") -> List[User]:
+        matcher = channel.mask_matcher(
+            mode, CASEFOLDERS[self.isupport.casemapping].fold)
+        matches = matcher.matches
+
+        users: List[User] = []
+        for channel_user in channel.users.values():
+            user = channel_user.get_user()
+            if matches(user.nickname, user.username, user.hostname):
+                users.append(user)
+        return users
+
     def create_user(self, nickname: Name) -> User:
         return User(nickname)
 
     def create_channel(self, name: Name) -> Channel:
         return Channel(name)
 
-    def _user_join(self, channel: Channel, user: User) -> ChannelUser:
+    def _user_join(self,
+            channel: Channel,
+            user:    User,
+            since:   Optional[float]=None) -> ChannelUser:
         channel_user = ChannelUser(
-            user.get_name(),
-            channel.get_name())
+            user, channel, self.clock() if since is None else since)
 
-        user.channels.add(self.casefold(channel.name))
+        if not channel.name_lower in user._channels:
+            self._memberships += 1
+        user._channels[channel.name_lower]  = channel_user
         channel.users[user.nickname_lower] = channel_user
         return channel_user
 
+    def _refold(self):
+        # casemapping changed: rebuild every folded index in one sweep
+        self.collect()
+        if self.user_cache is not None:
+            self.user_cache.clear()
+        casefold = self.casefold
+        self.nickname_lower = casefold(self.nickname)
+
+        users: Dict[str, User] = {}
+        for user in self.users.values():
+            user.change_nickname(user.nickname, casefold(user.nickname))
+            users[user.nickname_lower] = user
+
+        channels: Dict[str, Channel] = {}
+        for channel in self.channels.values():
+            channel.change_name(channel.name, casefold(channel.name))
+            channels[channel.name_lower] = channel
+            # a half-finished NAMES burst is keyed by the old folding
+            channel._names_temp = None
+            # ChannelUsers share their Name with the User refolded above
+            channel.users = {
+                cuser.nickname_lower: cuser for cuser in channel.users.values()
+            }
+
+        for user in users.values():
+            user._channels = {
+                cuser.get_channel().name_lower: cuser
+                for cuser in user._channels.values()
+            }
+
+        self.users    = users
+        self.channels = channels
+        self._split_users = {
+            casefold(split[0]): split for split in self._split_users.values()
+        }
+
+    def collect(self, limit: Optional[int]=None) -> int:
+        # release members of channels we've left that are in none of our
+        # other channels, checking at most `limit` of them; returns how
+        # many were checked
+        teardown = self._teardown
+        done     = 0
+        while teardown and (limit is None or done < limit):
+            members = teardown[0]
+            while members and (limit is None or done < limit):
+                user = members.pop()
+                # they may have since joined another of our channels, quit
+                # or been released under an old nickname
+                if (not user._channels and
+                        self.users.get(user.nickname_lower) is user):
+                    self._release_user(user)
+                done += 1
+            if not members:
+                teardown.popleft()
+        return done
+
+    def _user_leave(self, user: User, channel_lower: str):
+        # a user's memberships are their reference count; the last one
+        # going releases them
+        del user._channels[channel_lower]
+        self._memberships -= 1
+        if (not user._channels and
+                self.users.get(user.nickname_lower) is user):
+            self._release_user(user)
+
+    def _channel_remove_user(self, channel: Channel, user: User):
+        del channel.users[user.nickname_lower]
+        self._user_leave(user, channel.name_lower)
+
     def prepare_whox(self, target: str) -> Line:
         return build("WHO", [target, f"n%afhinrstu,{WHO_TYPE}"])
 
+    def _intern(self, s: Optional[str]) -> Optional[str]:
+        if self.string_pool is None:
+            return s
+        return self.string_pool.intern(s)
+
     def _self_hostmask(self, hostmask: Hostmask):
         self.nickname = hostmask.nickname
         if hostmask.username:
@@ -120,7 +461,10 @@ class Server(object):
             self.hostname = hostmask.hostname
 
     def _emit(self) -> Emit:
-        return Emit()
+        if self.emits:
+            return Emit()
+        # shared sink; handlers write to it and it's never returned
+        return self._null_emit
 
     @line_handler(RPL_WELCOME)
     # first message reliably sent to us after registration is complete
@@ -133,7 +477,10 @@ class Server(object):
     @line_handler(RPL_ISUPPORT)
     # https://defs.ircdocs.horse/defs/isupport.html
     def _handle_ISUPPORT(self, line: Line) -> Emit:
+        casemapping = self.isupport.casemapping
         self.isupport.from_tokens(line.params[1:-1])
+        if not self.isupport.casemapping is casemapping:
+            self._refold()
         return self._emit()
 
     @line_handler(RPL_MOTDSTART)
@@ -166,10 +513,10 @@ class Server(object):
             user.change_nickname(new_nickname, new_nickname_lower)
             self.users[new_nickname_lower] = user
 
-            for channel_lower in user.channels:
-                channel = self.channels[channel_lower]
-                channel_user = channel.users.pop(nickname_lower)
-                channel.users[user.nickname_lower] = channel_user
+            for channel_user in user._channels.values():
+                channel_users = channel_user.get_channel().users
+                del channel_users[nickname_lower]
+                channel_users[new_nickname_lower] = channel_user
 
         if nickname_lower == self.nickname_lower:
             emit.self = True
@@ -178,6 +525,99 @@ class Server(object):
             self.nickname_lower = new_nickname_lower
         return emit
 
+    def _join_burst(self,
+            lines:  List[Line],
+            start:  int,
+            parsed: List[Tuple[Line, TYPE_EMIT]]) -> int:
+        # apply a run of other users' JOINs (e.g. a netjoin) in one go,
+        # appending to `parsed` and returning the index after the run
+        fold      = self._current_casefold()
+        users     = self.users
+        emits     = self.emits
+        aggregate = emits and self.aggregate_joins
+        since     = self.clock()
+
+        # channel name as sent -> (channel_lower, Channel if we're in it)
+        targets: Dict[str, Tuple[str, Optional[Channel]]] = {}
+        # channel_lower -> (index in `parsed` of its Emit, users joined)
+        aggregated: Dict[str, Tuple[int, List[User]]] = {}
+
+        i = start
+        while i < len(lines):
+            line = lines[i]
+            if not line.command == "JOIN" or line.source is None:
+                break
+            hostmask       = line.hostmask
+            nickname_lower = fold(hostmask.nickname)
+            if nickname_lower == self.nickname_lower:
+                break
+            i += 1
+
+            target = line.params[0]
+            if not target in targets:
+                channel_lower = fold(target)
+                targets[target] = (
+                    channel_lower, self.channels.get(channel_lower, None))
+            channel_lower, channel = targets[target]
+
+            emit: TYPE_EMIT = None
+            if channel is None:
+                if emits and not aggregate:
+                    emit = Emit()
+                    emit.command = "JOIN"
+                parsed.append((line, emit))
+                continue
+
+            netsplit: Optional[str] = None
+            if self._split_users and nickname_lower in self._split_users:
+                netsplit = self._netjoin(nickname_lower)
+
+            user = users.get(nickname_lower, None)
+            if user is None:
+                user = self._add_user(hostmask.nickname, nickname_lower,
+                    hostmask.username, hostmask.hostname)
+            if hostmask.username:
+                user.username = self._intern(hostmask.username)
+            if hostmask.hostname:
+                user.hostname = self._intern(hostmask.hostname)
+            if len(line.params) == 3:
+                user.account  = self._intern(line.params[1].strip("*"))
+                user.realname = self._intern(line.params[2])
+
+            channel_user = self._user_join(channel, user, since)
+            channel_user._joined = since
+
+            if aggregate:
+                if channel_lower in aggregated:
+                    # move the channel's Emit along to its latest line
+                    index, joined = aggregated[channel_lower]
+                    last_line, emit = parsed[index]
+                    parsed[index] = (last_line, None)
+                    assert emit is not None
+                    if netsplit is None:
+                        emit.subcommand = None
+                        emit.text       = None
+                else:
+                    emit = Emit()
+                    emit.command = "JOIN"
+                    emit.channel = channel
+                    emit.users   = joined = []
+                    if netsplit is not None:
+                        emit.subcommand = "NETJOIN"
+                        emit.text       = netsplit
+                joined.append(user)
+                aggregated[channel_lower] = (len(parsed), joined)
+            elif emits:
+                emit = Emit()
+                emit.command = "JOIN"
+                emit.channel = channel
+                emit.user    = user
+                if netsplit is not None:
+                    emit.subcommand = "NETJOIN"
+                    emit.text       = netsplit
+            parsed.append((line, emit))
+        return i
+
     @line_handler("JOIN")
     def _handle_JOIN(self, line: Line) -> Emit:
         extended = len(line.params) == 3
@@ -197,7 +637,7 @@ class Server(object):
                 )
                 #TODO: put this somewhere better
                 for mode in self.isupport.chanmodes.a_modes:
-                    channel.list_modes[mode] = []
+                    channel.list_modes[mode] = {}
 
                 self.channels[channel_lower] = channel
 
@@ -209,21 +649,28 @@ class Server(object):
         if channel_lower in self.channels:
             channel = self.channels[channel_lower]
             emit.channel = channel
+            if self._split_users and nickname_lower in self._split_users:
+                netsplit = self._netjoin(nickname_lower)
+                if netsplit is not None:
+                    emit.subcommand = "NETJOIN"
+                    emit.text       = netsplit
+
             if not nickname_lower in self.users:
-                self._add_user(line.hostmask.nickname, nickname_lower)
+                self._add_user(line.hostmask.nickname, nickname_lower,
+                    line.hostmask.username, line.hostmask.hostname)
 
             user = self.users[nickname_lower]
             emit.user = user
             if line.hostmask.username:
-                user.username = line.hostmask.username
+                user.username = self._intern(line.hostmask.username)
             if line.hostmask.hostname:
-                user.hostname = line.hostmask.hostname
+                user.hostname = self._intern(line.hostmask.hostname)
             if extended:
-                user.account  = account
-                user.realname = realname
+                user.account  = self._intern(account)
+                user.realname = self._intern(realname)
 
             channel_user = self._user_join(channel, user)
-            channel_user.joined = now("utc")
+            channel_user._joined = channel_user._since
         return emit
 
     def _user_part(self, line: Line,
@@ -244,20 +691,24 @@ class Server(object):
             nickname_lower = self.casefold(nickname)
             if nickname_lower in self.users:
                 user = self.users[nickname_lower]
-
-                user.channels.remove(channel.name_lower)
-                del channel.users[user.nickname_lower]
-                if not user.channels:
-                    del self.users[nickname_lower]
+                self._channel_remove_user(channel, user)
 
             if nickname_lower == self.nickname_lower:
                 del self.channels[channel_lower]
-
-                for key, cuser in channel.users.items():
-                    ruser = self.users[key]
-                    ruser.channels.remove(channel.name_lower)
-                    if not ruser.channels:
-                        del self.users[ruser.nickname_lower]
+                self._list_mode_entries -= sum(
+                    len(entries) for entries in channel.list_modes.values())
+                # everyone loses the channel now, so User.channels and
+                # stats() are right straight away. releasing users is done
+                # here and now for small channels, a chunk per line parsed
+                # after this for big ones
+                members: List[User] = []
+                for channel_user in channel.users.values():
+                    member = channel_user._user
+                    del member._channels[channel_lower]
+                    members.append(member)
+                self._memberships -= len(members)
+                self._teardown.append(members)
+                self.collect(self.teardown_chunk)
 
         return emit, user
 
@@ -287,15 +738,108 @@ class Server(object):
             if kicker_lower in self.users:
                 emit.user_source = self.users[kicker_lower]
             else:
-                emit.user_source = self.create_user(
-                    Name(line.hostmask.nickname, kicker_lower)
-                )
+                emit.user_source = self._off_channel_user(
+                    line.hostmask.nickname, kicker_lower,
+                    line.hostmask.username, line.hostmask.hostname)
 
         return emit
 
     def _self_quit(self):
         self.users.clear()
         self.channels.clear()
+        self._teardown.clear()
+        self._memberships       = 0
+        self._list_mode_entries = 0
+        if self.user_cache is not None:
+            self.user_cache.clear()
+        self._split_users.clear()
+
+    def _remember_split(self,
+            nickname:       str,
+            nickname_lower: str,
+            reason:         str):
+        split_users = self._split_users
+        now = self.clock()
+        # keep oldest first, so what's expired or over memory is at the front
+        split_users.pop(nickname_lower, None)
+        split_users[nickname_lower] = (nickname, reason, now)
+        while split_users:
+            oldest = next(iter(split_users))
+            if (len(split_users) > NETSPLIT_MEMORY or
+                    now-split_users[oldest][2] > NETJOIN_WINDOW):
+                del split_users[oldest]
+            else:
+                break
+
+    def _netjoin(self, nickname_lower: str) -> Optional[str]:
+        # the netsplit reason if this JOIN is part of a netjoin
+        _, reason, split_at = self._split_users[nickname_lower]
+        if self.clock()-split_at > NETJOIN_WINDOW:
+            del self._split_users[nickname_lower]
+            return None
+        return reason
+
+    def _netsplit_end(self, lines: List[Line], start: int) -> int:
+        # index after the run of QUITs at `start` sharing one netsplit reason
+        first = lines[start]
+        if (first.source is None or
+                not first.params or
+                not _is_netsplit(first.params[0])):
+            return start+1
+
+        reason = first.params[0]
+        end    = start+1
+        while end < len(lines):
+            line = lines[end]
+            if not (line.command == "QUIT" and
+                    line.source is not None and
+                    line.params and
+                    line.params[0] == reason):
+                break
+            end += 1
+        return end
+
+    def _netsplit(self, lines: List[Line]) -> List[Tuple[Line, TYPE_EMIT]]:
+        # the same as each line going through _handle_quit(), but with one
+        # emit for the lot
+        reason = lines[0].params[0]
+
+        users: List[User] = []
+        self_quit = False
+        for line in lines:
+            nickname_lower = self.casefold(line.hostmask.nickname)
+            if nickname_lower == self.nickname_lower:
+                self_quit = True
+                self._self_quit()
+                continue
+
+            self._remember_split(
+                line.hostmask.nickname, nickname_lower, reason)
+            user = self.users.get(nickname_lower, None)
+            if user is None:
+                continue
+            users.append(user)
+
+            for channel_user in user._channels.values():
+                del channel_user.get_channel().users[nickname_lower]
+            self._memberships -= len(user._channels)
+            self._release_user(user)
+
+        parsed: List[Tuple[Line, TYPE_EMIT]] = [
+            (line, None) for line in lines[:-1]
+        ]
+        emit: TYPE_EMIT = None
+        if self.emits:
+            # one event for the whole split, on its last line
+            emit = self._emit()
+            emit.command    = "QUIT"
+            emit.subcommand = "NETSPLIT"
+            emit.text       = reason
+            emit.users      = users
+            if self_quit:
+                emit.self = True
+        parsed.append((lines[-1], emit))
+        return parsed
 
     @line_handler("QUIT")
     def _handle_quit(self, line: Line) -> Emit:
@@ -310,11 +854,18 @@ class Server(object):
             self._self_quit()
         else:
             if nickname_lower in self.users:
-                user = self.users.pop(nickname_lower)
+                user = self.users[nickname_lower]
                 emit.user = user
-                for channel_lower in user.channels:
-                    channel = self.channels[channel_lower]
-                    del channel.users[user.nickname_lower]
+                for channel_user in user._channels.values():
+                    del channel_user.get_channel().users[nickname_lower]
+                self._memberships -= len(user._channels)
+                self._release_user(user)
+
+            if reason is not None and _is_netsplit(reason):
+                self._remember_split(
+                line.hostmask.nickname, nickname_lower, reason)
+            elif nickname_lower in self._split_users:
+                del self._split_users[nickname_lower]
         return emit
 
     @line_handler("ERROR")
@@ -330,41 +881,84 @@ class Server(object):
         if channel_lower in self.channels:
             channel = self.channels[channel_lower]
             emit.channel = channel
-            nicknames = list(filter(bool, line.params[3].split(" ")))
             users: List[User] = []
             emit.users = users
 
-            for nickname in nicknames:
-                modes = ""
-                for char in nickname:
-                    mode = self.isupport.prefix.from_prefix(char)
-                    if mode:
-                        modes += mode
-                    else:
-                        break
+            staged = channel._names_temp
+            if staged is None:
+                staged = channel._names_temp = {}
 
-                hostmask = hostmask_(nickname[len(modes):])
-                nickname_lower = self.casefold(hostmask.nickname)
+            prefix_modes = self.isupport.prefix.prefix_modes
+            for name in line.params[3].split(" "):
+                if not name:
+                    continue
+
+                prefix_end = 0
+                while (prefix_end < len(name) and
+                        name[prefix_end] in prefix_modes):
+                    prefix_end += 1
+                prefixes = name[:prefix_end]
+                if prefixes:
+                    name = name[prefix_end:]
+
+                # userhost-in-names; same split as irctokens.hostmask()
+                username, _, hostname = name.partition("@")
+                nickname, _, username = username.partition("!")
+
+                nickname_lower = self.casefold(nickname)
                 if not nickname_lower in self.users:
-                    self._add_user(hostmask.nickname, nickname_lower)
+                    self._add_user(nickname, nickname_lower,
+                        username or None, hostname or None)
                 user = self.users[nickname_lower]
                 users.append(user)
 
                 if not nickname_lower in channel.users:
                     channel_user = self._user_join(channel, user)
+                    staged[nickname_lower] = user
                 else:
                     channel_user = channel.users[nickname_lower]
+                    if not nickname_lower in staged:
+                        staged[nickname_lower] = None
 
-                if hostmask.username:
-                    user.username = hostmask.username
-                if hostmask.hostname:
-                    user.hostname = hostmask.hostname
+                if username:
+                    user.username = self._intern(username)
+                if hostname:
+                    user.hostname = self._intern(hostname)
 
                 if nickname_lower == self.nickname_lower:
-                    self._self_hostmask(hostmask)
+                    self._self_hostmask(Hostmask(
+                        name, nickname, username or None, hostname or None))
+
+                for prefix in prefixes:
+                    channel_user.modes.add(prefix_modes[prefix])
+        return emit
+
+    @line_handler(RPL_ENDOFNAMES)
+    # end of a NAMES burst; drop members the burst didn't list
+    def _handle_names_end(self, line: Line) -> Emit:
+        emit = self._emit()
+        channel_lower = self.casefold(line.params[1])
+        if channel_lower in self.channels:
+            channel = self.channels[channel_lower]
+            emit.channel = channel
+
+            staged = channel._names_temp
+            if staged is not None:
+                channel._names_temp = None
+
+                stale = channel.users.keys() - staged.keys()
+                stale.discard(self.nickname_lower)
+
+                removed: List[User] = []
+                for nickname_lower in stale:
+                    user = channel.users[nickname_lower].get_user()
+                    self._channel_remove_user(channel, user)
+                    removed.append(user)
 
-                for mode in modes:
-                    channel_user.modes.add(mode)
+                emit.users_added = [
+                    user for user in staged.values() if user is not None
+                ]
+                emit.users_removed = removed
         return emit
 
     @line_handler(RPL_CREATIONTIME)
@@ -375,7 +969,7 @@ class Server(object):
         if channel_lower in self.channels:
             channel = self.channels[channel_lower]
             emit.channel = channel
-            channel.created = from_timestamp(int(line.params[2]))
+            channel._created = float(line.params[2])
         return emit
 
     @line_handler("TOPIC")
@@ -387,7 +981,7 @@ class Server(object):
             emit.channel = channel
             channel.topic        = line.params[1]
             channel.topic_setter = line.source
-            channel.topic_time   = now("utc")
+            channel._topic_time  = self.clock()
         return emit
 
     @line_handler(RPL_TOPIC)
@@ -409,53 +1003,59 @@ class Server(object):
             channel = self.channels[channel_lower]
             emit.channel = channel
             channel.topic_setter = line.params[2]
-            channel.topic_time   = from_timestamp(int(line.params[3]))
+            channel._topic_time  = float(line.params[3])
         return emit
 
     def _channel_modes(self,
             channel: Channel,
-            modes: List[str],
-            params: List[str]
+            modes: str,
+            params: List[str],
+            setter: Optional[str]=None
             ) -> List[Tuple[str, Optional[str]]]:
         tokens: List[Tuple[str, Optional[str]]] = []
-
-        for mode in modes:
-            add  = mode[0] == "+"
-            char = mode[1]
+        table   = self.isupport.chanmode_table
+        add     = True
+        param_i = 0
+        set_at: Optional[float] = None
+
+        for char in modes:
+            if char == "+":
+                add = True
+                continue
+            elif char == "-":
+                add = False
+                continue
+
+            kind, param_add, param_remove = table.get(char, MODE_UNKNOWN)
             arg: Optional[str] = None
-
-            if char in self.isupport.prefix.modes: # a user's status
-                arg = params.pop(0)
-                nickname_lower = self.casefold(arg)
-
-                if nickname_lower in self.users:
-                    user = self.users[nickname_lower]
-                    channel_user = channel.users[user.nickname_lower]
+            if param_add if add else param_remove:
+                arg = params[param_i]
+                param_i += 1
+
+            if kind == MODE_PREFIX: # a user's status
+                assert arg is not None
+                channel_user = channel.users.get(self.casefold(arg), None)
+                if channel_user is not None:
                     if add:
                         channel_user.modes.add(char)
                     else:
                         channel_user.modes.discard(char)
-            else:
-                has_arg = False
-                is_list = False
-                if char in self.isupport.chanmodes.a_modes:
-                    has_arg = True
-                    is_list = True
-                elif add:
-                    has_arg = char in (self.isupport.chanmodes.b_modes+
-                        self.isupport.chanmodes.c_modes)
-                else: # remove
-                    has_arg = char in self.isupport.chanmodes.b_modes
-
-                if has_arg:
-                    arg = params.pop(0)
-
+            elif kind == MODE_LIST:
+                entries = len(channel.list_modes.get(char, ()))
                 if add:
-                    channel.add_mode(char, arg, is_list)
+                    if set_at is None:
+                        set_at = self.clock()
+                    channel.add_mode(char, arg, True, setter, set_at)
                 else:
                     channel.remove_mode(char, arg)
+                self._list_mode_entries += (
+                    len(channel.list_modes.get(char, ())) - entries)
+            elif add:
+                channel.add_mode(char, arg, False)
+            else:
+                channel.remove_mode(char, arg)
 
-            tokens.append((mode, arg))
+            tokens.append((("+" if add else "-") + char, arg))
 
         return tokens
 
@@ -464,41 +1064,31 @@ class Server(object):
         emit = self._emit()
         target     = line.params[0]
         modes_str  = line.params[1]
-        params     = line.params[2:].copy()
-
-        modifier          = "+"
-        modes: List[str]  = []
-
-        for c in list(modes_str):
-            if c in ["+", "-"]:
-                modifier = c
-            else:
-                modes.append(f"{modifier}{c}")
 
         target_lower = self.casefold(target)
         if target_lower == self.nickname_lower:
             emit.self_target = True
-            emit.tokens = modes
 
-            for mode in modes:
-                add  = mode[0] == "+"
-                char = mode[1]
-                if add:
+            modes: List[str] = []
+            add = True
+            for char in modes_str:
+                if char == "+":
+                    add = True
+                elif char == "-":
+                    add = False
+                elif add:
                     self.modes.add(char)
+                    modes.append(f"+{char}")
                 else:
                     self.modes.discard(char)
+                    modes.append(f"-{char}")
+            emit.tokens = modes
         elif target_lower in self.channels:
-            channel = self.channels[self.casefold(target)]
+            channel = self.channels[target_lower]
             emit.channel = channel
-            ctokens = self._channel_modes(channel, modes, params)
-
-            ctokens_str: List[str] = []
-            for mode, arg in ctokens:
-                if arg is not None:
-                    ctokens_str.append(f"{mode} {arg}")
-                else:
-                    ctokens_str.append(mode)
-            emit.tokens = ctokens_str
+            # formatted into strings when `emit.tokens` is first read
+            emit._mode_tokens = self._channel_modes(
+                channel, modes_str, line.params[2:], line.source)
         return emit
 
     @line_handler(RPL_CHANNELMODEIS)
@@ -509,7 +1099,7 @@ class Server(object):
         if channel_lower in self.channels:
             channel = self.channels[channel_lower]
             emit.channel = channel
-            modes   = [f"+{char}" for char in line.params[2].lstrip("+")]
+            modes   = line.params[2].lstrip("+")
             params  = line.params[3:]
             self._channel_modes(channel, modes, params)
         return emit
@@ -524,34 +1114,39 @@ class Server(object):
     def _mode_list(self,
             channel_name: str,
             mode: str,
-            mask: str):
+            mask: str,
+            setter: Optional[str],
+            set_at: Optional[float]):
         channel_lower = self.casefold(channel_name)
         if channel_lower in self.channels:
             channel = self.channels[channel_lower]
             if not mode in channel._list_modes_temp:
-                channel._list_modes_temp[mode] = []
-            channel._list_modes_temp[mode].append(mask)
+                channel._list_modes_temp[mode] = {}
+            channel._list_modes_temp[mode][mask] = ListModeEntry(
+                setter, set_at)
     def _mode_list_end(self,
             channel_name: str,
             mode: str):
         channel_lower = self.casefold(channel_name)
         if channel_lower in self.channels:
             channel = self.channels[channel_lower]
-            if mode in channel._list_modes_temp:
-                mlist = channel._list_modes_temp.pop(mode)
-                channel.list_modes[mode] = mlist
+            entries = len(channel.list_modes.get(mode, ()))
+            # swap the staged list in whole; an empty burst means no entries
+            channel.set_list_mode(mode, channel._list_modes_temp.pop(mode, {}))
+            self._list_mode_entries += len(channel.list_modes[mode]) - entries
 
     @line_handler(RPL_BANLIST)
     def _handle_banlist(self, line: Line) -> Emit:
         channel = line.params[1]
         mask    = line.params[2]
 
-        if len(line.params) > 3:
-            # parse these out but we're not storing them yet
-            set_by  = line.params[3]
-            set_at  = int(line.params[4])
+        setter: Optional[str]      = None
+        set_at: Optional[float] = None
+        if len(line.params) > 4:
+            setter = line.params[3]
+            set_at = float(line.params[4])
 
-        self._mode_list(channel, "b", mask)
+        self._mode_list(channel, "b", mask, setter, set_at)
         return self._emit()
 
     @line_handler(RPL_ENDOFBANLIST)
@@ -565,10 +1160,10 @@ class Server(object):
         channel = line.params[1]
         mode    = line.params[2]
         mask    = line.params[3]
-        set_by  = line.params[4]
-        set_at  = int(line.params[5])
+        setter  = line.params[4]
+        set_at  = float(line.params[5])
 
-        self._mode_list(channel, mode, mask)
+        self._mode_list(channel, mode, mask, setter, set_at)
         return self._emit()
 
     @line_handler(RPL_ENDOFQUIETLIST)
@@ -599,15 +1194,15 @@ class Server(object):
         if nickname_lower in self.users:
             user = self.users[nickname_lower]
         else:
-            user = self.create_user(
-                Name(line.hostmask.nickname, nickname_lower)
-            )
+            user = self._off_channel_user(
+                line.hostmask.nickname, nickname_lower,
+                line.hostmask.username, line.hostmask.hostname)
         emit.user = user
 
         if line.hostmask.username:
-            user.username = line.hostmask.username
+            user.username = self._intern(line.hostmask.username)
         if line.hostmask.hostname:
-            user.hostname = line.hostmask.hostname
+            user.hostname = self._intern(line.hostmask.hostname)
 
         target_raw = target = line.params[0]
         statusmsg = []
@@ -643,15 +1238,15 @@ class Server(object):
         emit = self._emit()
         emit.target = line.params[1]
         nickname = line.params[5]
-        username = line.params[2]
-        hostname = line.params[3]
+        username = self._intern(line.params[2])
+        hostname = self._intern(line.params[3])
         status   = line.params[6]
         away     = "" if "G" in status else None
-        realname = line.params[7].split(" ", 1)[1]
+        realname = self._intern(line.params[7].split(" ", 1)[1])
 
         server:  Optional[str] = None
         if not line.params[4] == "*":
-            server  = line.params[4]
+            server  = self._intern(line.params[4])
 
         nickname_lower = self.casefold(line.params[5])
         if nickname_lower == self.nickname_lower:
@@ -678,23 +1273,23 @@ class Server(object):
         emit = self._emit()
         if line.params[1] == WHO_TYPE and len(line.params) == 10:
             nickname_lower = self.casefold(line.params[6])
-            username = line.params[2]
-            hostname = line.params[4]
+            username = self._intern(line.params[2])
+            hostname = self._intern(line.params[4])
             status   = line.params[7]
             away     = "" if "G" in status else None
-            realname = line.params[9]
+            realname = self._intern(line.params[9])
 
-            account  = ""
+            account: Optional[str] = ""
             if not line.params[8] == "0":
-                account = line.params[8]
+                account = self._intern(line.params[8])
 
             server:  Optional[str] = None
             if not line.params[5] == "*":
-                server  = line.params[5]
+                server  = self._intern(line.params[5])
             ip:      Optional[str] = None
             if not line.params[3] == "255.255.255.255":
                 try:
-                    ip = ip_address(line.params[3]).compressed
+                    ip = _ip_address()(line.params[3]).compressed
                 except ValueError:
                     pass
 
@@ -728,9 +1323,9 @@ class Server(object):
     def _handle_whoisuser(self, line: Line) -> Emit:
         emit = self._emit()
         nickname = line.params[1]
-        username = line.params[2]
-        hostname = line.params[3]
-        realname = line.params[5]
+        username = self._intern(line.params[2])
+        hostname = self._intern(line.params[3])
+        realname = self._intern(line.params[5])
 
         nickname_lower = self.casefold(nickname)
         if nickname_lower == self.nickname_lower:
@@ -750,8 +1345,8 @@ class Server(object):
     @line_handler("CHGHOST")
     def _handle_CHGHOST(self, line: Line) -> Emit:
         emit = self._emit()
-        username = line.params[0]
-        hostname = line.params[1]
+        username = self._intern(line.params[0])
+        hostname = self._intern(line.params[1])
         nickname_lower = self.casefold(line.hostmask.nickname)
         if nickname_lower == self.nickname_lower:
             emit.self = True
@@ -768,7 +1363,7 @@ class Server(object):
     @line_handler("SETNAME")
     def _handle_SETNAME(self, line: Line) -> Emit:
         emit = self._emit()
-        realname = line.params[0]
+        realname = self._intern(line.params[0])
         nickname_lower = self.casefold(line.hostmask.nickname)
         if nickname_lower == self.nickname_lower:
             emit.self = True
@@ -790,10 +1385,10 @@ class Server(object):
             channel = self.channels.pop(source_fold)
 
             channel.change_name(rename, rename_fold)
-            for nickname in channel.users.keys():
-                user = self.users[nickname]
-                user.channels.remove(source_fold)
-                user.channels.add(rename_fold)
+            for channel_user in channel.users.values():
+                user_channels = channel_user.get_user()._channels
+                del user_channels[source_fold]
+                user_channels[rename_fold] = channel_user
 
             self.channels[rename_fold] = channel
         return self._emit()
@@ -831,7 +1426,7 @@ class Server(object):
     @line_handler("ACCOUNT")
     def _handle_ACCOUNT(self, line: Line) -> Emit:
         emit = self._emit()
-        account = line.params[0].strip("*")
+        account = self._intern(line.params[0].strip("*"))
         nickname_lower = self.casefold(line.hostmask.nickname)
         if nickname_lower == self.nickname_lower:
             emit.self = True
@@ -905,3 +1500,5 @@ class Server(object):
         self.account = None
         self._self_hostmask(hostmask)
         return self._emit()
+
+Server._line_handlers = compile_handlers(Server, LINE_HANDLERS)
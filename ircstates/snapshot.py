@@ -0,0 +1,324 @@
+import gc, sys
+from array  import array
+from math   import isnan
+from struct import Struct
+from typing import BinaryIO, Dict, List, Optional, TYPE_CHECKING
+from .isupport  import ISupport
+from .list_mode import ListModeEntry
+from .names     import Name
+
+if TYPE_CHECKING:
+    from .server import Server
+    from .user   import User
+
+# a snapshot is MAGIC, then a sequence of blocks, each a little-endian u32
+# item count followed by the items. the first block is the version, then the
+# string table (character lengths, then one utf8 blob) - after which strings
+# are u32 references: 0 for None, n+1 for string table entry n. the rest are
+# arrays of references, counts and doubles (NaN for None), in the order
+# write() puts them. packing each kind of field into one array lets read()
+# decode them in bulk rather than a field at a time
+MAGIC   = b"IRCS"
+VERSION = 1
+
+_U32  = Struct("<I")
+_NONE = float("nan")
+# array() is native-endian, the file is little-endian
+_SWAP = sys.byteorder == "big"
+
+class SnapshotException(Exception):
+    pass
+
+class _StringTable(object):
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+
+    def ref(self, s: Optional[str]) -> int:
+        if s is None:
+            return 0
+        elif not s in self._index:
+            self._index[s] = len(self._index)+1
+        return self._index[s]
+
+    def strings(self) -> List[str]:
+        return list(self._index)
+
+def _time(f: Optional[float]) -> float:
+    return _NONE if f is None else f
+def _optional_time(f: float) -> Optional[float]:
+    return None if isnan(f) else f
+
+def _write_array(fp: BinaryIO, typecode: str, items: List):
+    values = array(typecode, items)
+    if _SWAP:
+        values.byteswap()
+    fp.write(_U32.pack(len(values)))
+    fp.write(values.tobytes())
+
+def _read_exact(fp: BinaryIO, size: int) -> bytes:
+    data = fp.read(size)
+    if not len(data) == size:
+        raise SnapshotException("truncated snapshot")
+    return data
+
+def _read_array(fp: BinaryIO, typecode: str) -> array:
+    count  = _U32.unpack(_read_exact(fp, _U32.size))[0]
+    values = array(typecode)
+    values.frombytes(_read_exact(fp, count*values.itemsize))
+    if _SWAP:
+        values.byteswap()
+    return values
+
+def _escape(value: str) -> str:
+    # undone by ISupport.from_tokens()
+    return value.replace("\\", "\\\\")
+
+def write(server: "Server", fp: BinaryIO):
+    # members of channels we've left aren't part of the state
+    server.collect()
+
+    table = _StringTable()
+    ref   = table.ref
+
+    header = [int(server.registered), int(server.has_cap)] + [
+        ref(s) for s in [
+            server.nickname, server.nickname_lower,
+            server.username, server.hostname, server.realname,
+            server.account, server.server, server.away, server.ip,
+            "".join(sorted(server.modes))
+        ]
+    ]
+    motd = [ref(motd_line) for motd_line in server.motd]
+
+    # key/value pairs
+    isupport: List[int] = []
+    for key, value in server.isupport.raw.items():
+        isupport += [ref(key), ref(value)]
+    temp_caps: List[int] = []
+    for cap, cap_value in server._temp_caps.items():
+        temp_caps += [ref(cap), ref(cap_value)]
+    available_caps: List[int] = []
+    for cap, cap_value in server.available_caps.items():
+        available_caps += [ref(cap), ref(cap_value)]
+    agreed_caps = [ref(cap) for cap in server.agreed_caps]
+
+    # users are referred to by their position here
+    user_index: Dict[str, int] = {}
+    users: List[int] = []
+    for nickname_lower, user in server.users.items():
+        user_index[nickname_lower] = len(user_index)
+        users += [
+            ref(user.nickname), ref(nickname_lower),
+            ref(user.username), ref(user.hostname), ref(user.realname),
+            ref(user.account),  ref(user.server),   ref(user.away),
+            ref(user.ip)
+        ]
+
+    # per channel: name, name_lower, topic, topic_setter, mode count,
+    # list mode count, member count
+    channels:      List[int]   = []
+    channel_times: List[float] = []
+    # mode char, param
+    modes:         List[int]   = []
+    # mode char, entry count
+    list_modes:    List[int]   = []
+    # mask, setter
+    entries:       List[int]   = []
+    entry_times:   List[float] = []
+    # user index, modes
+    members:       List[int]   = []
+    member_times:  List[float] = []
+    for channel_lower, channel in server.channels.items():
+        channels += [
+            ref(channel.name), ref(channel_lower),
+            ref(channel.topic), ref(channel.topic_setter),
+            len(channel.modes), len(channel.list_modes), len(channel.users)
+        ]
+        channel_times += [
+            _time(channel._topic_time), _time(channel._created)]
+
+        for char, param in channel.modes.items():
+            modes += [ref(char), ref(param)]
+
+        for char, mode_entries in channel.list_modes.items():
+            list_modes += [ref(char), len(mode_entries)]
+            for mask, entry in mode_entries.items():
+                entries += [ref(mask), ref(entry.setter)]
+                entry_times.append(_time(entry._set_at))
+
+        for nickname_lower, channel_user in channel.users.items():
+            members += [
+                user_index[nickname_lower],
+                ref("".join(sorted(channel_user.modes)))
+            ]
+            member_times += [
+                channel_user._since, _time(channel_user._joined)]
+
+    strings = table.strings()
+    fp.write(MAGIC)
+    _write_array(fp, "I", [VERSION])
+    _write_array(fp, "I", [len(s) for s in strings])
+    blob = "".join(strings).encode("utf8", "surrogatepass")
+    fp.write(_U32.pack(len(blob)))
+    fp.write(blob)
+
+    for block in [header, motd, isupport, temp_caps, available_caps,
+            agreed_caps, users, channels, modes, list_modes, entries,
+            members]:
+        _write_array(fp, "I", block)
+    for times in [channel_times, entry_times, member_times]:
+        _write_array(fp, "d", times)
+
+def read(server: "Server", fp: BinaryIO):
+    # replaces everything `server` knows with what's in the snapshot. the
+    # whole file is read and checked before `server` is touched, so a bad
+    # header, version or length leaves it unchanged; contents that turn out
+    # not to hold together leave it emptied
+    if not fp.read(len(MAGIC)) == MAGIC:
+        raise SnapshotException("not a snapshot")
+    version = _read_array(fp, "I")
+    if not list(version) == [VERSION]:
+        raise SnapshotException(f"unsupported snapshot version {version}")
+
+    lengths   = _read_array(fp, "I")
+    blob_size = _U32.unpack(_read_exact(fp, _U32.size))[0]
+    try:
+        blob = _read_exact(fp, blob_size).decode("utf8", "surrogatepass")
+    except UnicodeDecodeError:
+        raise SnapshotException("bad string table")
+    # reference 0 is None
+    strings: List[Optional[str]] = [None]
+    offset = 0
+    for length in lengths:
+        strings.append(blob[offset:offset+length])
+        offset += length
+
+    (header, motd, isupport, temp_caps, available_caps, agreed_caps,
+        users, channels, modes, list_modes, entries, members) = [
+        _read_array(fp, "I") for _ in range(12)]
+    channel_times, entry_times, member_times = [
+        _read_array(fp, "d") for _ in range(3)]
+
+    # nothing made here is garbage; don't let the cyclic collector keep
+    # rescanning it as it's built
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _restore(server, strings,
+            header, motd, isupport, temp_caps, available_caps, agreed_caps,
+            users, channels, modes, list_modes, entries, members,
+            channel_times, entry_times, member_times)
+    except (IndexError, TypeError, ValueError):
+        server._self_quit()
+        raise SnapshotException("malformed snapshot")
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _restore(server: "Server",
+        strings:        List[Optional[str]],
+        header:         array,
+        motd:           array,
+        isupport:       array,
+        temp_caps:      array,
+        available_caps: array,
+        agreed_caps:    array,
+        users:          array,
+        channels:       array,
+        modes:          array,
+        list_modes:     array,
+        entries:        array,
+        members:        array,
+        channel_times:  array,
+        entry_times:    array,
+        member_times:   array):
+    s = strings.__getitem__
+    server._self_quit()
+
+    (registered, has_cap, nickname, nickname_lower, username, hostname,
+        realname, account, server_name, away, ip, self_modes) = header
+    server.registered     = bool(registered)
+    server.nickname       = s(nickname) or ""
+    server.nickname_lower = s(nickname_lower) or ""
+    server.username = s(username)
+    server.hostname = s(hostname)
+    server.realname = s(realname)
+    server.account  = s(account)
+    server.server   = s(server_name)
+    server.away     = s(away)
+    server.ip       = s(ip)
+    server.modes    = set(s(self_modes) or "")
+    server.motd     = [s(i) for i in motd]
+
+    tokens: List[str] = []
+    for i in range(0, len(isupport), 2):
+        key, value = s(isupport[i]), s(isupport[i+1])
+        tokens.append(key if value is None else f"{key}={_escape(value)}")
+    server.isupport = ISupport()
+    server.isupport.from_tokens(tokens)
+
+    server.has_cap = bool(has_cap)
+    server._temp_caps = {
+        s(temp_caps[i]): s(temp_caps[i+1])
+        for i in range(0, len(temp_caps), 2)
+    }
+    server.available_caps = {
+        s(available_caps[i]): s(available_caps[i+1])
+        for i in range(0, len(available_caps), 2)
+    }
+    server.agreed_caps = [s(i) for i in agreed_caps]
+
+    create_user = server.create_user
+    user_list: List["User"] = []
+    for i in range(0, len(users), 9):
+        (nickname, nickname_lower, username, hostname, realname, account,
+            server_name, away, ip) = users[i:i+9]
+        user = create_user(Name(s(nickname), s(nickname_lower)))
+        user.username = s(username)
+        user.hostname = s(hostname)
+        user.realname = s(realname)
+        user.account  = s(account)
+        user.server   = s(server_name)
+        user.away     = s(away)
+        user.ip       = s(ip)
+        server.users[user.nickname_lower] = user
+        user_list.append(user)
+
+    user_join = server._user_join
+    mode_i = list_i = entry_i = member_i = 0
+    for channel_i in range(0, len(channels), 7):
+        (name, name_lower, topic, topic_setter,
+            mode_count, list_count, member_count) = channels[channel_i:channel_i+7]
+        channel = server.create_channel(Name(s(name), s(name_lower)))
+        channel.topic        = s(topic)
+        channel.topic_setter = s(topic_setter)
+        time_i = channel_i//7*2
+        channel._topic_time  = _optional_time(channel_times[time_i])
+        channel._created     = _optional_time(channel_times[time_i+1])
+
+        for _ in range(mode_count):
+            channel.modes[s(modes[mode_i])] = s(modes[mode_i+1])
+            mode_i += 2
+
+        for _ in range(list_count):
+            mode_entries: Dict[str, ListModeEntry] = {}
+            for _ in range(list_modes[list_i+1]):
+                mode_entries[s(entries[entry_i*2])] = ListModeEntry(
+                    s(entries[entry_i*2+1]),
+                    _optional_time(entry_times[entry_i]))
+                entry_i += 1
+            channel.list_modes[s(list_modes[list_i])] = mode_entries
+            server._list_mode_entries += len(mode_entries)
+            list_i += 2
+
+        for _ in range(member_count):
+            channel_user = user_join(channel,
+                user_list[members[member_i*2]], member_times[member_i*2])
+            joined = member_times[member_i*2+1]
+            if not isnan(joined):
+                channel_user._joined = joined
+            member_modes = s(members[member_i*2+1])
+            if member_modes:
+                channel_user.modes.update(member_modes)
+            member_i += 1
+        server.channels[channel.name_lower] = channel
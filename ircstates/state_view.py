@@ -0,0 +1,400 @@
+import mmap
+from datetime import datetime
+from struct   import Struct, error as struct_error
+from typing   import (Any, BinaryIO, Dict, List, Optional, Set, Tuple,
+    TYPE_CHECKING)
+from .casemap  import CASEFOLDERS, CaseMap
+from .clock    import to_datetime
+from .snapshot import (SnapshotException, _StringTable, _time,
+    _optional_time)
+
+if TYPE_CHECKING:
+    from .server import Server
+
+# an export is a header, then fixed-width records: users sorted by
+# nickname_lower, channels sorted by name_lower, memberships grouped by
+# channel and sorted by user, each user's membership indexes (sorted by
+# channel), channel modes, then the string table - u32 end offsets into one
+# utf8 blob. strings are u32 references: 0 for None, n+1 for string n.
+# everything's found by offset and binary search, so a StateView over an
+# mmap only reads the pages a lookup touches, and any number of processes
+# can share one file through the page cache
+MAGIC   = b"IRSV"
+VERSION = 1
+
+# magic, version, casemapping, user/channel/member/mode/string counts
+_HEADER  = Struct("<4s7I")
+# nickname_lower, nickname, username, hostname, realname, account, server,
+# away, ip, first membership index, membership count
+_USER    = Struct("<11I")
+# name_lower, name, topic, topic_setter, first mode, mode count,
+# first member, member count, topic_time, created
+_CHANNEL = Struct("<8I2d")
+# user, channel, modes, since, joined
+_MEMBER  = Struct("<3I2d")
+# char, param
+_MODE    = Struct("<2I")
+_U32     = Struct("<I")
+
+def write(server: "Server", fp: BinaryIO):
+    # members of channels we've left aren't part of the state
+    server.collect()
+
+    table = _StringTable()
+    ref   = table.ref
+    casemapping = ref(server.isupport.casemapping.value)
+
+    user_names    = sorted(server.users)
+    user_index    = {name: i for i, name in enumerate(user_names)}
+    user_members: List[List[int]] = [[] for _ in user_names]
+
+    channels: List[bytes] = []
+    members:  List[bytes] = []
+    modes:    List[bytes] = []
+    for channel_lower in sorted(server.channels):
+        channel = server.channels[channel_lower]
+        channel_i = len(channels)
+        channels.append(_CHANNEL.pack(
+            ref(channel_lower), ref(channel.name),
+            ref(channel.topic), ref(channel.topic_setter),
+            len(modes), len(channel.modes),
+            len(members), len(channel.users),
+            _time(channel._topic_time), _time(channel._created)
+        ))
+
+        for char, param in channel.modes.items():
+            modes.append(_MODE.pack(ref(char), ref(param)))
+
+        # users are sorted by nickname_lower, so their indexes are too
+        for user_i in sorted(user_index[n] for n in channel.users):
+            channel_user = channel.users[user_names[user_i]]
+            user_members[user_i].append(len(members))
+            members.append(_MEMBER.pack(
+                user_i, channel_i, ref("".join(sorted(channel_user.modes))),
+                channel_user._since, _time(channel_user._joined)
+            ))
+
+    users: List[bytes] = []
+    member_indexes: List[int] = []
+    for user_i, nickname_lower in enumerate(user_names):
+        user = server.users[nickname_lower]
+        users.append(_USER.pack(
+            ref(nickname_lower), ref(user.nickname),
+            ref(user.username), ref(user.hostname), ref(user.realname),
+            ref(user.account),  ref(user.server),   ref(user.away),
+            ref(user.ip),
+            len(member_indexes), len(user_members[user_i])
+        ))
+        member_indexes += user_members[user_i]
+
+    encoded = [s.encode("utf8", "surrogatepass") for s in table.strings()]
+    ends: List[int] = []
+    end = 0
+    for string in encoded:
+        end += len(string)
+        ends.append(end)
+
+    fp.write(_HEADER.pack(MAGIC, VERSION, casemapping,
+        len(users), len(channels), len(members), len(modes), len(encoded)))
+    fp.write(b"".join(users))
+    fp.write(b"".join(channels))
+    fp.write(b"".join(members))
+    fp.write(Struct(f"<{len(member_indexes)}I").pack(*member_indexes))
+    fp.write(b"".join(modes))
+    fp.write(Struct(f"<{len(ends)}I").pack(*ends))
+    fp.write(b"".join(encoded))
+
+def _datetime(f: float) -> Optional[datetime]:
+    try:
+        return to_datetime(_optional_time(f))
+    except (OverflowError, OSError, ValueError):
+        raise SnapshotException("bad time")
+
+def _field(i: int) -> property:
+    return property(lambda self: self._view._string(self._record[i]))
+
+class UserView(object):
+    __slots__ = ("_view", "_index", "_record")
+
+    def __init__(self, view: "StateView", index: int):
+        self._view   = view
+        self._index  = index
+        self._record = view._user_record(index)
+
+    def __repr__(self) -> str:
+        return f"UserView(nickname={self.nickname!r})"
+
+    nickname_lower = _field(0)
+    nickname       = _field(1)
+    username       = _field(2)
+    hostname       = _field(3)
+    realname       = _field(4)
+    account        = _field(5)
+    server         = _field(6)
+    away           = _field(7)
+    ip             = _field(8)
+
+    @property
+    def channels(self) -> List[str]:
+        # channel_lowers, like User.channels
+        view = self._view
+        return [view._key(view._channel_record(member[1])[0])
+            for member in self._members()]
+
+    def _members(self) -> List[Tuple]:
+        view = self._view
+        first, count = self._record[9:11]
+        return [view._member_record(view._member_index(first+i))
+            for i in range(count)]
+
+class ChannelUserView(object):
+    __slots__ = ("_view", "_record")
+
+    def __init__(self, view: "StateView", record: Tuple):
+        self._view   = view
+        self._record = record
+
+    def __repr__(self) -> str:
+        return f"ChannelUserView({self.channel} {self.nickname})"
+
+    def get_user(self) -> UserView:
+        return UserView(self._view, self._record[0])
+    def get_channel(self) -> "ChannelView":
+        return ChannelView(self._view, self._record[1])
+
+    @property
+    def nickname(self) -> str:
+        return self.get_user().nickname
+    @property
+    def nickname_lower(self) -> str:
+        return self.get_user().nickname_lower
+    @property
+    def channel(self) -> str:
+        return self.get_channel().name
+
+    @property
+    def modes(self) -> Set[str]:
+        return set(self._view._string(self._record[2]) or "")
+    @property
+    def since(self) -> datetime:
+        since = _datetime(self._record[3])
+        assert since is not None
+        return since
+    @property
+    def joined(self) -> Optional[datetime]:
+        return _datetime(self._record[4])
+
+class ChannelView(object):
+    __slots__ = ("_view", "_index", "_record")
+
+    def __init__(self, view: "StateView", index: int):
+        self._view   = view
+        self._index  = index
+        self._record = view._channel_record(index)
+
+    def __repr__(self) -> str:
+        return f"ChannelView(name={self.name!r})"
+
+    name_lower   = _field(0)
+    name         = _field(1)
+    topic        = _field(2)
+    topic_setter = _field(3)
+
+    @property
+    def topic_time(self) -> Optional[datetime]:
+        return _datetime(self._record[8])
+    @property
+    def created(self) -> Optional[datetime]:
+        return _datetime(self._record[9])
+
+    @property
+    def modes(self) -> Dict[str, Optional[str]]:
+        view = self._view
+        first, count = self._record[4:6]
+        modes: Dict[str, Optional[str]] = {}
+        for i in range(first, first+count):
+            char, param = view._mode_record(i)
+            modes[view._key(char)] = view._string(param)
+        return modes
+
+    @property
+    def users(self) -> Dict[str, ChannelUserView]:
+        # nickname_lower -> ChannelUserView, like Channel.users. decodes
+        # every member; has_user()/get_user() don't
+        view = self._view
+        first, count = self._record[6:8]
+        users: Dict[str, ChannelUserView] = {}
+        for i in range(first, first+count):
+            record = view._member_record(i)
+            nickname_lower = view._key(view._user_record(record[0])[0])
+            users[nickname_lower] = ChannelUserView(view, record)
+        return users
+
+    def has_user(self, nickname: str) -> bool:
+        return self.get_user(nickname) is not None
+    def get_user(self, nickname: str) -> Optional[ChannelUserView]:
+        view   = self._view
+        user_i = view._find_user(nickname)
+        if user_i is None:
+            return None
+
+        # members are sorted by user index
+        lo, hi = self._record[6], self._record[6]+self._record[7]
+        while lo < hi:
+            mid    = (lo+hi)//2
+            record = view._member_record(mid)
+            if record[0] < user_i:
+                lo = mid+1
+            elif record[0] > user_i:
+                hi = mid
+            else:
+                return ChannelUserView(view, record)
+        return None
+
+class StateView(object):
+    def __init__(self, buffer: Any):
+        # `buffer` is anything supporting the buffer protocol; bytes from
+        # Server.export() or, via open(), an mmap of a file it wrote
+        self._buffer = memoryview(buffer)
+        self._mmap: Optional[mmap.mmap] = None
+
+        buf = self._buffer
+        if (len(buf) < _HEADER.size or
+                not bytes(buf[:len(MAGIC)]) == MAGIC):
+            raise SnapshotException("not a state export")
+        (_, version, casemapping, self.user_count, self.channel_count,
+            member_count, mode_count, string_count
+            ) = _HEADER.unpack_from(buf)
+        if not version == VERSION:
+            raise SnapshotException(
+                f"unsupported state export version {version}")
+
+        self._users    = _HEADER.size
+        self._channels = self._users    + self.user_count*_USER.size
+        self._members  = self._channels + self.channel_count*_CHANNEL.size
+        self._member_indexes = self._members + member_count*_MEMBER.size
+        self._modes    = self._member_indexes + member_count*_U32.size
+        self._ends     = self._modes + mode_count*_MODE.size
+        self._blob     = self._ends  + string_count*_U32.size
+        self._member_count = member_count
+        self._mode_count   = mode_count
+        self._string_count = string_count
+
+        if (len(buf) < self._blob or (string_count and
+                len(buf) < self._blob+self._string_end(string_count))):
+            raise SnapshotException("truncated state export")
+
+        try:
+            self.casemapping = CaseMap(self._string(casemapping))
+        except ValueError:
+            raise SnapshotException("unknown casemapping")
+        self._casefold = CASEFOLDERS[self.casemapping].fold
+
+    def __repr__(self) -> str:
+        return (f"StateView(users={self.user_count}, "
+            f"channels={self.channel_count})")
+
+    @classmethod
+    def open(cls, path: str) -> "StateView":
+        with open(path, "rb") as fp:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        view = cls(mapped)
+        view._mmap = mapped
+        return view
+
+    def close(self):
+        # views handed out stop working after this
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "StateView":
+        return self
+    def __exit__(self, *args):
+        self.close()
+
+    # everything read from the buffer goes through these, so a corrupt
+    # export fails with SnapshotException like any other bad input
+    def _unpack(self, struct: Struct, offset: int) -> Tuple:
+        try:
+            return struct.unpack_from(self._buffer, offset)
+        except (struct_error, IndexError):
+            raise SnapshotException("malformed state export")
+    def _record(self, struct: Struct, start: int, count: int, i: int
+            ) -> Tuple:
+        if not 0 <= i < count:
+            raise SnapshotException("bad record reference")
+        return self._unpack(struct, start+i*struct.size)
+
+    def _string_end(self, ref: int) -> int:
+        return self._unpack(_U32, self._ends+(ref-1)*_U32.size)[0]
+    def _string_bytes(self, ref: int) -> bytes:
+        if not 0 < ref <= self._string_count:
+            raise SnapshotException("bad string reference")
+        start = 0 if ref == 1 else self._string_end(ref-1)
+        end   = self._string_end(ref)
+        if not start <= end <= len(self._buffer)-self._blob:
+            raise SnapshotException("bad string table")
+        return bytes(self._buffer[self._blob+start:self._blob+end])
+    def _string(self, ref: int) -> Optional[str]:
+        if ref == 0:
+            return None
+        try:
+            return self._string_bytes(ref).decode("utf8", "surrogatepass")
+        except UnicodeDecodeError:
+            raise SnapshotException("bad string table")
+    def _key(self, ref: int) -> str:
+        # names and mode chars are never None
+        return self._string(ref) or ""
+
+    def _user_record(self, i: int) -> Tuple:
+        return self._record(_USER, self._users, self.user_count, i)
+    def _channel_record(self, i: int) -> Tuple:
+        return self._record(_CHANNEL, self._channels, self.channel_count, i)
+    def _member_record(self, i: int) -> Tuple:
+        return self._record(_MEMBER, self._members, self._member_count, i)
+    def _member_index(self, i: int) -> int:
+        return self._record(_U32, self._member_indexes,
+            self._member_count, i)[0]
+    def _mode_record(self, i: int) -> Tuple:
+        return self._record(_MODE, self._modes, self._mode_count, i)
+
+    def _search(self, offset: int, size: int, count: int, key: str
+            ) -> Optional[int]:
+        # records at `offset` are sorted by the string their first field
+        # refers to. utf8 sorts like the strings it encodes, so compare bytes
+        key_bytes = key.encode("utf8", "surrogatepass")
+        lo, hi = 0, count
+        while lo < hi:
+            mid   = (lo+hi)//2
+            found = self._string_bytes(
+                self._unpack(_U32, offset+mid*size)[0])
+            if found < key_bytes:
+                lo = mid+1
+            elif found > key_bytes:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def casefold(self, s1: str) -> str:
+        return self._casefold(s1)
+
+    def _find_user(self, nickname: str) -> Optional[int]:
+        return self._search(self._users, _USER.size, self.user_count,
+            self.casefold(nickname))
+    def has_user(self, nickname: str) -> bool:
+        return self._find_user(nickname) is not None
+    def get_user(self, nickname: str) -> Optional[UserView]:
+        user_i = self._find_user(nickname)
+        return None if user_i is None else UserView(self, user_i)
+
+    def _find_channel(self, name: str) -> Optional[int]:
+        return self._search(self._channels, _CHANNEL.size,
+            self.channel_count, self.casefold(name))
+    def has_channel(self, name: str) -> bool:
+        return self._find_channel(name) is not None
+    def get_channel(self, name: str) -> Optional[ChannelView]:
+        channel_i = self._find_channel(name)
+        return None if channel_i is None else ChannelView(self, channel_i)
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from typing      import Dict, Optional
+
+class StringPool(object):
+    def __init__(self, maxsize: int=65536):
+        self.maxsize = maxsize
+        self.hits    = 0
+        self.misses  = 0
+        self._pool: "OrderedDict[str, str]" = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"StringPool(size={len(self._pool)}, maxsize={self.maxsize})"
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def intern(self, s: Optional[str]) -> Optional[str]:
+        if s is None:
+            return None
+
+        pool   = self._pool
+        pooled = pool.get(s)
+        if pooled is not None:
+            self.hits += 1
+            pool.move_to_end(s)
+            return pooled
+
+        self.misses += 1
+        pool[s] = s
+        if len(pool) > self.maxsize:
+            # least recently seen
+            pool.popitem(last=False)
+        return s
+
+    def clear(self):
+        self._pool.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size":    len(self._pool),
+            "maxsize": self.maxsize,
+            "hits":    self.hits,
+            "misses":  self.misses
+        }
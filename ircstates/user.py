@@ -1,7 +1,14 @@
-from typing import Optional, Set
-from .names import Name
+from typing        import Dict, KeysView, Optional
+from .channel_user import ChannelUser
+from .names        import Name
 
 class User(object):
+    __slots__ = (
+        "_nickname",
+        "username", "hostname", "realname", "account", "server", "away", "ip",
+        "_channels"
+    )
+
     def __init__(self, nickname: Name):
         self._nickname = nickname
 
@@ -12,11 +19,17 @@ class User(object):
         self.server:   Optional[str] = None
         self.away:     Optional[str] = None
         self.ip:       Optional[str] = None
-        self.channels: Set[str]      = set([])
+        # channel_lower -> our ChannelUser there. small dicts are no bigger
+        # than the set of channel names this used to be
+        self._channels: Dict[str, ChannelUser] = {}
 
     def __repr__(self) -> str:
         return f"User(nickname={self.nickname!r})"
 
+    @property
+    def channels(self) -> KeysView[str]:
+        return self._channels.keys()
+
     def get_name(self) -> Name:
         return self._nickname
     @property
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing      import Dict, Optional, Tuple
+from .clock      import TYPE_CLOCK, wall_clock
+from .user       import User
+
+def _compatible(user: User,
+        username: Optional[str],
+        hostname: Optional[str]) -> bool:
+    # don't hand a nickname's old details (account, ip, ...) to someone
+    # else using it; unless we can tell it's the same person, it isn't
+    return (username is not None and
+        hostname is not None and
+        user.username == username and
+        user.hostname == hostname)
+
+class UserCache(object):
+    def __init__(self,
+            maxsize: int=1024,
+            ttl:     Optional[float]=None):
+        self.maxsize = maxsize
+        # seconds since a user was last seen before they're forgotten
+        self.ttl     = ttl
+        self.clock: TYPE_CLOCK = wall_clock
+        self.hits    = 0
+        self.misses  = 0
+        # nickname_lower -> (User, last seen), least recently seen first
+        self._users: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"UserCache(size={len(self._users)}, maxsize={self.maxsize})"
+    def __len__(self) -> int:
+        return len(self._users)
+    def __contains__(self, nickname_lower: str) -> bool:
+        return nickname_lower in self._users
+
+    def _expire(self, now: float):
+        if self.ttl is not None:
+            users  = self._users
+            oldest = now-self.ttl
+            while users and next(iter(users.values()))[1] < oldest:
+                users.popitem(last=False)
+
+    def add(self, user: User):
+        now   = self.clock()
+        users = self._users
+        users[user.nickname_lower] = (user, now)
+        users.move_to_end(user.nickname_lower)
+        if len(users) > self.maxsize:
+            users.popitem(last=False)
+        self._expire(now)
+
+    def get(self,
+            nickname_lower: str,
+            username: Optional[str]=None,
+            hostname: Optional[str]=None) -> Optional[User]:
+        # look up and keep a user, counting them as seen again
+        now = self.clock()
+        self._expire(now)
+        users = self._users
+        if nickname_lower in users:
+            user, _ = users[nickname_lower]
+            if _compatible(user, username, hostname):
+                self.hits += 1
+                users[nickname_lower] = (user, now)
+                users.move_to_end(nickname_lower)
+                return user
+        self.misses += 1
+        return None
+
+    def take(self,
+            nickname_lower: str,
+            username: Optional[str]=None,
+            hostname: Optional[str]=None) -> Optional[User]:
+        # look up and remove a user, e.g. as they join one of our channels
+        self._expire(self.clock())
+        cached = self._users.pop(nickname_lower, None)
+        if cached is not None and _compatible(cached[0], username, hostname):
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        return None
+
+    def clear(self):
+        self._users.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size":    len(self._users),
+            "maxsize": self.maxsize,
+            "hits":    self.hits,
+            "misses":  self.misses
+        }
@@ -16,7 +16,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/jesopo/ircstates",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmark*", "test*"]),
     package_data={"ircstates": ["py.typed"]},
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -27,5 +27,9 @@ setuptools.setup(
         "Topic :: Communications :: Chat :: Internet Relay Chat"
     ],
     python_requires='>=3.8',
-    install_requires=install_requires
+    install_requires=install_requires,
+    extras_require={
+        # DateTime properties return pendulum DateTimes when it's installed
+        "pendulum": ["pendulum ~=3.0.0"]
+    }
 )
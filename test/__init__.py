@@ -8,3 +8,14 @@ from .casemap  import *
 from .emit     import *
 from .who      import *
 from .sasl     import *
+from .batch    import *
+from .dispatch import *
+from .string_pool import *
+from .metrics import *
+from .stats import *
+from .snapshot import *
+from .state_view import *
+from .user_cache import *
+from .mask_match import *
+from .importtime import *
+from .throughput import *
@@ -0,0 +1,281 @@
+import unittest
+import ircstates, irctokens
+
+class BatchTestRecvAndParse(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        parsed = server.recv_and_parse(
+            b"001 nickname *\r\n"
+            b":nickname JOIN #chan\r\n"
+            b":other JOIN #chan\r\n"
+            b"PING :123\r\n"
+        )
+        self.assertEqual(len(parsed), 4)
+
+        lines = [line for line, _ in parsed]
+        self.assertEqual(
+            [line.command for line in lines],
+            ["001", "JOIN", "JOIN", "PING"]
+        )
+
+        _, emit = parsed[2]
+        self.assertEqual(emit.command, "JOIN")
+        self.assertEqual(emit.user,    server.users["other"])
+        self.assertEqual(emit.channel, server.channels["#chan"])
+        self.assertIsNone(parsed[3][1])
+
+    def test_partial(self):
+        server = ircstates.Server("test")
+        parsed = server.recv_and_parse(b"001 nickname *\r\n:nickname JO")
+        self.assertEqual(len(parsed), 1)
+        parsed = server.recv_and_parse(b"IN #chan\r\n")
+        self.assertEqual(len(parsed), 1)
+        self.assertIn("#chan", server.channels)
+
+    def test_without_emits(self):
+        server = ircstates.Server("test")
+        parsed = server.recv_and_parse(
+            b"001 nickname *\r\n:nickname JOIN #chan\r\n", emits=False)
+        self.assertEqual([emit for _, emit in parsed], [None, None])
+        self.assertIn("#chan", server.channels)
+        self.assertIn("nickname", server.users)
+
+    def test_disconnected(self):
+        server = ircstates.Server("test")
+        with self.assertRaises(ircstates.ServerDisconnectedException):
+            server.recv_and_parse(b"")
+
+class BatchTestParseLines(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        lines = [
+            irctokens.tokenise("001 nickname *"),
+            irctokens.tokenise(":nickname JOIN #chan")
+        ]
+        parsed = server.parse_lines(lines)
+        self.assertEqual([line for line, _ in parsed], lines)
+        self.assertTrue(parsed[1][1].self)
+
+class BatchTestNetsplit(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        for nickname in ["nickname", "a", "b", "c"]:
+            self.server.parse_tokens(
+                irctokens.tokenise(f":{nickname} JOIN #chan"))
+        for nickname in ["nickname", "b"]:
+            self.server.parse_tokens(
+                irctokens.tokenise(f":{nickname} JOIN #other"))
+
+    def test(self):
+        lines = [
+            irctokens.tokenise(":a QUIT :irc.one.net irc.two.net"),
+            irctokens.tokenise(":b QUIT :irc.one.net irc.two.net"),
+            irctokens.tokenise(":c QUIT :bye")
+        ]
+        parsed = self.server.parse_lines(lines)
+        self.assertEqual([line for line, _ in parsed], lines)
+        self.assertIsNone(parsed[0][1])
+
+        emit = parsed[1][1]
+        self.assertEqual(emit.command,    "QUIT")
+        self.assertEqual(emit.subcommand, "NETSPLIT")
+        self.assertEqual(emit.text,       "irc.one.net irc.two.net")
+        self.assertEqual([u.nickname for u in emit.users], ["a", "b"])
+        self.assertIsNone(parsed[2][1].subcommand)
+
+        self.assertEqual(list(self.server.users), ["nickname"])
+        self.assertEqual(
+            list(self.server.channels["#chan"].users), ["nickname"])
+        self.assertEqual(
+            list(self.server.channels["#other"].users), ["nickname"])
+
+    def test_without_emits(self):
+        parsed = self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ], emits=False)
+        self.assertEqual([emit for _, emit in parsed], [None, None])
+        self.assertEqual(list(self.server.users), ["nickname", "c"])
+
+    def test_not_netsplit(self):
+        parsed = self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :bye bye"),
+            irctokens.tokenise(":b QUIT :bye bye")
+        ])
+        self.assertEqual(parsed[0][1].user.nickname, "a")
+        self.assertEqual(parsed[1][1].user.nickname, "b")
+
+    def test_netjoin_window(self):
+        # counted from the split, not from the first rejoin
+        now = [1000.0]
+        self.server.clock = lambda: now[0]
+        self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ])
+        now[0] += 60
+        emit = self.server.parse_tokens(irctokens.tokenise(":a JOIN #chan"))
+        self.assertEqual(emit.subcommand, "NETJOIN")
+
+        now[0] += 3*24*60*60
+        emit = self.server.parse_tokens(irctokens.tokenise(":b JOIN #chan"))
+        self.assertIsNone(emit.subcommand)
+        emit = self.server.parse_tokens(irctokens.tokenise(":a JOIN #other"))
+        self.assertIsNone(emit.subcommand)
+
+    def test_netsplit_expiry(self):
+        # splits older than the window are forgotten as new ones come in
+        now = [1000.0]
+        self.server.clock = lambda: now[0]
+        self.server.parse_tokens(irctokens.tokenise(":a QUIT :*.net *.split"))
+        now[0] += ircstates.server.NETJOIN_WINDOW+1
+        self.server.parse_tokens(irctokens.tokenise(":b QUIT :*.net *.split"))
+        self.assertEqual(list(self.server._split_users), ["b"])
+
+    def test_netjoin_casemapping(self):
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #x"))
+        self.server.parse_tokens(irctokens.tokenise(":Z[ JOIN #x"))
+        self.server.parse_tokens(irctokens.tokenise(":Z[ QUIT :*.net *.split"))
+        self.server.parse_tokens(
+            irctokens.tokenise("005 * CASEMAPPING=ascii *"))
+        self.assertEqual(list(self.server._split_users), ["z["])
+        emit = self.server.parse_tokens(irctokens.tokenise(":z[ JOIN #chan"))
+        self.assertEqual(emit.subcommand, "NETJOIN")
+
+    def test_self(self):
+        parsed = self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":nickname QUIT :*.net *.split")
+        ])
+        self.assertTrue(parsed[1][1].self)
+        self.assertEqual(self.server.users, {})
+        self.assertEqual(self.server.channels, {})
+
+    def test_unknown_user(self):
+        # remembered like _handle_quit() would, for a later netjoin
+        self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":z QUIT :*.net *.split")
+        ])
+        emit = self.server.parse_tokens(irctokens.tokenise(":z JOIN #chan"))
+        self.assertEqual(emit.subcommand, "NETJOIN")
+
+    def test_netjoin(self):
+        self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ])
+        emit = self.server.parse_tokens(irctokens.tokenise(":b JOIN #chan"))
+        self.assertEqual(emit.subcommand, "NETJOIN")
+        self.assertEqual(emit.text,       "*.net *.split")
+        emit = self.server.parse_tokens(irctokens.tokenise(":b JOIN #other"))
+        self.assertEqual(emit.subcommand, "NETJOIN")
+
+        emit = self.server.parse_tokens(irctokens.tokenise(":c JOIN #new"))
+        self.assertIsNone(emit.subcommand)
+
+    def test_overridden(self):
+        class Server(ircstates.Server):
+            def _handle_quit(self, line):
+                return super()._handle_quit(line)
+        server = Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        parsed = server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ])
+        self.assertIsNotNone(parsed[0][1])
+        self.assertIsNotNone(parsed[1][1])
+
+class BatchTestJoinBurst(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.parse_lines([
+            irctokens.tokenise("001 nickname *"),
+            irctokens.tokenise(":nickname JOIN #chan"),
+            irctokens.tokenise(":nickname JOIN #other")
+        ])
+        self.lines = [
+            irctokens.tokenise(":a!u@h JOIN #chan"),
+            irctokens.tokenise(":b JOIN #other"),
+            irctokens.tokenise(":b JOIN #chan"),
+            irctokens.tokenise(":c JOIN #unknown")
+        ]
+
+    def test(self):
+        parsed = self.server.parse_lines(self.lines)
+        self.assertEqual([line for line, _ in parsed], self.lines)
+        self.assertEqual(
+            [emit.user.nickname for _, emit in parsed[:3]], ["a", "b", "b"])
+        self.assertEqual(parsed[0][1].channel.name, "#chan")
+        self.assertEqual(parsed[0][1].command, "JOIN")
+        self.assertIsNone(parsed[3][1].channel)
+
+        self.assertEqual(self.server.users["a"].hostname, "h")
+        self.assertEqual(self.server.users["b"].channels, {"#chan", "#other"})
+        self.assertEqual(
+            list(self.server.channels["#chan"].users), ["nickname", "a", "b"])
+        self.assertNotIn("c", self.server.users)
+
+    def test_aggregate(self):
+        self.server.aggregate_joins = True
+        parsed = self.server.parse_lines(self.lines)
+        self.assertIsNone(parsed[0][1])
+        self.assertIsNone(parsed[3][1])
+
+        emit = parsed[1][1]
+        self.assertEqual(emit.channel.name, "#other")
+        self.assertEqual([u.nickname for u in emit.users], ["b"])
+        emit = parsed[2][1]
+        self.assertEqual(emit.channel.name, "#chan")
+        self.assertEqual([u.nickname for u in emit.users], ["a", "b"])
+
+    def test_netjoin(self):
+        self.server.aggregate_joins = True
+        self.server.parse_lines([
+            irctokens.tokenise(":a JOIN #chan"),
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+        ])
+        parsed = self.server.parse_lines(self.lines[:3])
+        self.assertEqual(parsed[2][1].subcommand, None)
+
+        self.server.parse_lines([
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ])
+        parsed = self.server.parse_lines(self.lines[:3])
+        self.assertEqual(parsed[2][1].subcommand, "NETJOIN")
+        self.assertEqual(parsed[2][1].text, "*.net *.split")
+
+    def test_self(self):
+        parsed = self.server.parse_lines([
+            irctokens.tokenise(":a JOIN #chan"),
+            irctokens.tokenise(":nickname JOIN #new"),
+            irctokens.tokenise(":a JOIN #new")
+        ])
+        self.assertTrue(parsed[1][1].self)
+        self.assertEqual(self.server.users["a"].channels, {"#chan", "#new"})
+
+class BatchTestTeardown(unittest.TestCase):
+    def test(self):
+        # fused runs keep deferred teardown going, like single lines do
+        server = ircstates.Server("test")
+        server.teardown_chunk = 1
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #big"))
+        server.parse_tokens(irctokens.tokenise("353 * * #big :a b c d e f"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":nickname PART #big"))
+        self.assertEqual(len(server.users), 6)
+
+        server.parse_lines([
+            irctokens.tokenise(":x JOIN #chan"),
+            irctokens.tokenise(":y JOIN #chan")
+        ])
+        self.assertEqual(len(server.users), 6)
+        server.parse_lines([
+            irctokens.tokenise(":x QUIT :*.net *.split"),
+            irctokens.tokenise(":y QUIT :*.net *.split")
+        ])
+        self.assertEqual(set(server.users), {"nickname", "a"})
@@ -10,6 +10,26 @@ class CaseMapTestMethod(unittest.TestCase):
         lower = ircstates.casefold(ircstates.CaseMap.ASCII, "ÀTEST[]~\\")
         self.assertEqual(lower, "Àtest[]~\\")
 
+    def test_rfc1459_strict(self):
+        lower = ircstates.casefold(
+            ircstates.CaseMap.RFC1459_STRICT, "ÀTEST[]^\\")
+        self.assertEqual(lower, "Àtest{}^|")
+
+    def test_fast_path(self):
+        from ircstates.casemap import CASEMAPS, CaseFolder
+        for casemap in ircstates.CaseMap:
+            folder = CaseFolder(casemap)
+            for s in ["nick", "NiCk", "[N]", "ni^ck", "À[b]", "user\\1"]:
+                self.assertEqual(folder.fold(s), s.translate(CASEMAPS[casemap]))
+
+    def test_cached(self):
+        from ircstates.casemap import CaseFolder
+        folder = CaseFolder(ircstates.CaseMap.RFC1459, cache_size=2)
+        folder.fold("A")
+        folder.fold("A")
+        info = folder.fold.cache_info()
+        self.assertEqual((info.hits, info.misses, info.maxsize), (1, 1, 2))
+
 class CaseMapTestCommands(unittest.TestCase):
     def test_join(self):
         server = ircstates.Server("test")
@@ -38,3 +58,51 @@ class CaseMapTestCommands(unittest.TestCase):
         self.assertEqual(user.nickname_lower, "newnickname")
         self.assertEqual(server.nickname, "NewNickname")
         self.assertEqual(server.nickname_lower, "newnickname")
+
+    def test_casemapping_change(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        self.assertEqual(server.casefold("Nick[]"), "nick{}")
+        server.parse_tokens(irctokens.tokenise("005 * CASEMAPPING=ascii *"))
+        self.assertEqual(server.casefold("Nick[]"), "nick[]")
+        server.parse_tokens(
+            irctokens.tokenise("005 * CASEMAPPING=rfc1459-strict *"))
+        self.assertEqual(server.casefold("Nick[]^"), "nick{}^")
+
+class CaseMapTestRefold(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 Nick^ *"))
+        server.parse_tokens(irctokens.tokenise(":Nick^ JOIN #Chan[1]"))
+        server.parse_tokens(irctokens.tokenise(":Other[a] JOIN #Chan[1]"))
+        self.assertIn("other{a}", server.users)
+        self.assertIn("#chan{1}", server.channels)
+
+        server.parse_tokens(irctokens.tokenise("005 * CASEMAPPING=ascii *"))
+        self.assertEqual(server.nickname_lower, "nick^")
+        self.assertEqual(set(server.users), {"nick^", "other[a]"})
+        self.assertEqual(set(server.channels), {"#chan[1]"})
+
+        channel = server.get_channel("#CHAN[1]")
+        self.assertIsNotNone(channel)
+        self.assertEqual(channel.name, "#Chan[1]")
+        self.assertEqual(channel.name_lower, "#chan[1]")
+        self.assertEqual(set(channel.users), {"nick^", "other[a]"})
+
+        user = server.users["other[a]"]
+        self.assertEqual(user.nickname_lower, "other[a]")
+        self.assertEqual(user.channels, {"#chan[1]"})
+        self.assertEqual(channel.users["other[a]"].nickname_lower, "other[a]")
+        self.assertTrue(server.has_user("OTHER[A]"))
+
+        server.parse_tokens(irctokens.tokenise(":Other[a] PART #Chan[1]"))
+        self.assertNotIn("other[a]", server.users)
+        self.assertEqual(set(channel.users), {"nick^"})
+
+    def test_unchanged(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        users = server.users
+        server.parse_tokens(irctokens.tokenise("005 * CASEMAPPING=rfc1459 *"))
+        self.assertIs(server.users, users)
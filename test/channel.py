@@ -168,6 +168,68 @@ class ChannelTestNAMES(unittest.TestCase):
         self.assertEqual(user.username, "user2")
         self.assertEqual(user.hostname, "host2")
 
+    def test_prefix_table(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(
+            irctokens.tokenise("005 * PREFIX=(qaohv)~&@%+ *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(
+            "353 * * #chan :~&nickname  %+other!u@h +third"))
+
+        channel = server.channels["#chan"]
+        self.assertEqual(set(channel.users), {"nickname", "other", "third"})
+        self.assertEqual(channel.users["nickname"].modes, {"q", "a"})
+        self.assertEqual(channel.users["other"].modes, {"h", "v"})
+        self.assertEqual(channel.users["third"].modes, {"v"})
+        self.assertEqual(server.users["other"].userhost(), "u@h")
+        self.assertIsNone(server.users["third"].userhost())
+
+class ChannelTestENDOFNAMES(unittest.TestCase):
+    def test_join(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(
+            irctokens.tokenise("353 * * #chan :nickname @other"))
+        emit = server.parse_tokens(irctokens.tokenise("366 * #chan :end"))
+
+        channel = server.channels["#chan"]
+        self.assertEqual(emit.channel, channel)
+        self.assertEqual(emit.users_added, [server.users["other"]])
+        self.assertEqual(emit.users_removed, [])
+        self.assertEqual(set(channel.users), {"nickname", "other"})
+
+    def test_refresh(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan2"))
+        server.parse_tokens(irctokens.tokenise(":other JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":other JOIN #chan2"))
+        server.parse_tokens(irctokens.tokenise(":stale JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise("366 * #chan :end"))
+        self.assertIn("stale", server.users)
+
+        stale = server.users["stale"]
+        other = server.users["other"]
+        server.parse_tokens(
+            irctokens.tokenise("353 * * #chan :nickname other"))
+        server.parse_tokens(irctokens.tokenise("353 * * #chan :new"))
+        emit = server.parse_tokens(irctokens.tokenise("366 * #chan :end"))
+
+        channel = server.channels["#chan"]
+        self.assertEqual(set(channel.users), {"nickname", "other", "new"})
+        self.assertEqual(emit.users_added,   [server.users["new"]])
+        self.assertEqual(emit.users_removed, [stale])
+        self.assertNotIn("stale", server.users)
+        self.assertEqual(other.channels, {"#chan", "#chan2"})
+
+        # a second 366 without a new burst changes nothing
+        emit = server.parse_tokens(irctokens.tokenise("366 * #chan :end"))
+        self.assertIsNone(emit.users_removed)
+        self.assertEqual(set(channel.users), {"nickname", "other", "new"})
+
 class ChannelNICKAfterJoin(unittest.TestCase):
     def test(self):
         server = ircstates.Server("test")
@@ -183,6 +245,93 @@ class ChannelNICKAfterJoin(unittest.TestCase):
         self.assertEqual(channel_user.nickname,       "Nickname2")
         self.assertEqual(channel_user.nickname_lower, "nickname2")
 
+class ChannelTestUserIndex(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan2"))
+        self.server.parse_tokens(irctokens.tokenise(":other JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":other JOIN #chan2"))
+
+    def test(self):
+        user = self.server.users["other"]
+        channel = self.server.channels["#chan"]
+        channel_user = channel.users["other"]
+        self.assertIs(channel_user.get_user(), user)
+        self.assertIs(channel_user.get_channel(), channel)
+        self.assertIs(user._channels["#chan"], channel_user)
+
+    def test_nick(self):
+        self.server.parse_tokens(irctokens.tokenise(":other NICK Other2"))
+        user = self.server.users["other2"]
+        for channel_lower in ["#chan", "#chan2"]:
+            channel_user = self.server.channels[channel_lower].users["other2"]
+            self.assertIs(channel_user.get_user(), user)
+            self.assertIs(user._channels[channel_lower], channel_user)
+
+    def test_quit(self):
+        self.server.parse_tokens(irctokens.tokenise(":other QUIT :bye"))
+        self.assertEqual(list(self.server.channels["#chan"].users), ["nickname"])
+        self.assertEqual(list(self.server.channels["#chan2"].users), ["nickname"])
+
+    def test_self_part(self):
+        user = self.server.users["other"]
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.assertEqual(user.channels, {"#chan2"})
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan2"))
+        self.assertEqual(self.server.users, {})
+
+class ChannelTestTeardown(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.teardown_chunk = 2
+        self.server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan2"))
+        self.server.parse_tokens(
+            irctokens.tokenise("353 nickname = #chan :a b c d e"))
+        self.server.parse_tokens(irctokens.tokenise(":e JOIN #chan2"))
+
+    def test(self):
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.assertNotIn("#chan", self.server.channels)
+        self.assertEqual(len(self.server.users), 5)
+
+        self.server.parse_tokens(irctokens.tokenise("PING :x"))
+        self.assertEqual(len(self.server.users), 3)
+
+        self.assertEqual(self.server.collect(), 1)
+        self.assertEqual(set(self.server.users), {"nickname", "e"})
+        self.assertEqual(self.server.users["e"].channels, {"#chan2"})
+        self.assertEqual(self.server.collect(), 0)
+
+    def test_pending(self):
+        # members lose the channel at once; only releasing them waits
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        users = self.server.users
+        self.assertEqual(users["a"].channels, set())
+        self.assertEqual(users["e"].channels, {"#chan2"})
+        for user in users.values():
+            for channel_lower in user.channels:
+                self.assertIn(channel_lower, self.server.channels)
+        self.assertEqual(self.server.stats()["memberships"], 2)
+
+    def test_quit(self):
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":a QUIT :bye"))
+        self.server.parse_tokens(irctokens.tokenise(":b NICK b2"))
+        self.server.collect()
+        self.assertEqual(set(self.server.users), {"nickname", "e"})
+
+    def test_rejoin(self):
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":a JOIN #chan"))
+        self.server.collect()
+        self.assertEqual(self.server.users["a"].channels, {"#chan"})
+        self.assertIn("a", self.server.channels["#chan"].users)
+
 class ChannelRENAME(unittest.TestCase):
     def test(self):
         server = ircstates.Server("test")
@@ -201,3 +350,40 @@ class ChannelRENAME(unittest.TestCase):
         self.assertNotIn("#chan", server.channels)
         self.assertIn("#chan2", server.channels)
         self.assertEqual(len(server.channels), 1)
+
+class ChannelTestClock(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        server.clock = lambda: 1630896922.5
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise("353 * * #chan :nickname other"))
+        server.parse_tokens(irctokens.tokenise(":other TOPIC #chan :hi"))
+        server.parse_tokens(irctokens.tokenise(":other MODE #chan +b a!*@*"))
+
+        dt = pendulum.from_timestamp(1630896922.5)
+        channel = server.channels["#chan"]
+        self.assertEqual(channel.users["nickname"].since,  dt)
+        self.assertEqual(channel.users["nickname"].joined, dt)
+        self.assertEqual(channel.users["other"].since,     dt)
+        self.assertIsNone(channel.users["other"].joined)
+        self.assertEqual(channel.topic_time, dt)
+        self.assertEqual(channel.list_modes["b"]["a!*@*"].set_at, dt)
+        self.assertIsNone(channel.created)
+
+    def test_setters(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        channel = server.channels["#chan"]
+
+        dt = pendulum.datetime(2021, 9, 6, 2, 55, 22)
+        channel.created = dt
+        channel.users["nickname"].joined = dt
+        channel.users["nickname"].since  = dt
+        self.assertEqual(channel.created, dt)
+        self.assertEqual(channel.users["nickname"].joined, dt)
+        self.assertEqual(channel.users["nickname"].since,  dt)
+        self.assertEqual(channel.users["nickname"]._since, dt.timestamp())
+        channel.created = None
+        self.assertIsNone(channel.created)
@@ -0,0 +1,53 @@
+import unittest
+import ircstates, irctokens
+from ircstates.names import Name
+
+class DispatchTestSubclass(unittest.TestCase):
+    def test_create_user(self):
+        class MyUser(ircstates.User):
+            pass
+        class MyServer(ircstates.Server):
+            def create_user(self, nickname: Name) -> ircstates.User:
+                return MyUser(nickname)
+
+        server = MyServer("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.assertIsInstance(server.users["nickname"], MyUser)
+
+    def test_handler_override(self):
+        class MyServer(ircstates.Server):
+            def _handle_TOPIC(self, line):
+                emit = super()._handle_TOPIC(line)
+                emit.text = "overridden"
+                return emit
+
+        server = MyServer("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        emit = server.parse_tokens(
+            irctokens.tokenise(":other TOPIC #chan :hello"))
+        self.assertEqual(emit.command, "TOPIC")
+        self.assertEqual(emit.text, "overridden")
+        self.assertEqual(server.channels["#chan"].topic, "hello")
+
+        base = ircstates.Server("test")
+        base.parse_tokens(irctokens.tokenise("001 nickname *"))
+        base.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        emit = base.parse_tokens(
+            irctokens.tokenise(":other TOPIC #chan :hello"))
+        self.assertIsNone(emit.text)
+
+class DispatchTestFused(unittest.TestCase):
+    def test_motd_start(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise("375 * :old start"))
+        server.parse_tokens(irctokens.tokenise("372 * :old line"))
+        emit = server.parse_tokens(irctokens.tokenise("375 * :new start"))
+        self.assertEqual(emit.command, "375")
+        self.assertEqual(server.motd, ["new start"])
+
+    def test_unknown_command(self):
+        server = ircstates.Server("test")
+        self.assertIsNone(server.parse_tokens(irctokens.tokenise("PING :1")))
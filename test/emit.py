@@ -104,3 +104,63 @@ class EmitTest(unittest.TestCase):
         self.assertEqual(emit.channel, channel)
         self.assertEqual(emit.tokens,
             ["+i", "+m", "-m", "+b asd!*@*", "-k key"])
+
+class EmitTestDisabled(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        server.emits = False
+        self.assertIsNone(
+            server.parse_tokens(irctokens.tokenise("001 nickname *")))
+        self.assertIsNone(
+            server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan")))
+        self.assertIsNone(server.parse_tokens(
+            irctokens.tokenise(":other PRIVMSG #chan :hello")))
+        self.assertIn("#chan", server.channels)
+        self.assertIn("nickname", server.users)
+
+        server.emits = True
+        emit = server.parse_tokens(irctokens.tokenise(":other JOIN #chan"))
+        self.assertIsNotNone(emit)
+        self.assertEqual(emit.user, server.users["other"])
+
+    def test_no_allocation(self):
+        server = ircstates.Server("test")
+        server.emits = False
+        self.assertIs(server._emit(), server._emit())
+
+    def test_no_references(self):
+        # the shared emit mustn't keep departed users/channels alive
+        server = ircstates.Server("test")
+        server.emits = False
+        for line in ["001 nickname *", ":nickname JOIN #chan",
+                ":other JOIN #chan", ":nickname PART #chan"]:
+            server.parse_tokens(irctokens.tokenise(line))
+        self.assertIsNone(server._null_emit.user)
+        self.assertIsNone(server._null_emit.channel)
+
+        server.parse_lines([
+            irctokens.tokenise(":nickname JOIN #chan"),
+            irctokens.tokenise(":a JOIN #chan"),
+            irctokens.tokenise(":b JOIN #chan")
+        ], emits=False)
+        self.assertIsNone(server._null_emit.user)
+        self.assertIsNone(server._null_emit.channel)
+
+class EmitTestSlots(unittest.TestCase):
+    def test_defaults(self):
+        emit = ircstates.Emit()
+        self.assertIsNone(emit.command)
+        self.assertIsNone(emit.user)
+        self.assertIsNone(emit.tokens)
+        with self.assertRaises(AttributeError):
+            emit.unknown
+
+    def test_mode_tokens_lazy(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        emit = server.parse_tokens(
+            irctokens.tokenise(":server MODE #chan +o-k nickname key"))
+        self.assertIsNone(emit._tokens)
+        self.assertEqual(emit.tokens, ["+o nickname", "-k key"])
+        self.assertIs(emit.tokens, emit.tokens)
@@ -0,0 +1,28 @@
+import unittest
+from benchmark.importtime import measure
+
+class ImportTimeTest(unittest.TestCase):
+    def test_lazy_pendulum(self):
+        timings = measure("ircstates")
+        self.assertIn("ircstates", timings)
+        self.assertNotIn("pendulum", timings)
+        self.assertNotIn("ipaddress", timings)
+        self.assertNotIn("mmap", timings)
+        self.assertNotIn("ircstates.snapshot", timings)
+
+    def test_without_pendulum(self):
+        import subprocess, sys
+        code = "\n".join([
+            "import sys",
+            "sys.modules['pendulum'] = None",
+            "from datetime import datetime, timezone",
+            "import ircstates, irctokens",
+            "server = ircstates.Server('test')",
+            "server.parse_tokens(irctokens.tokenise('001 nickname *'))",
+            "server.parse_tokens(irctokens.tokenise(':nickname JOIN #chan'))",
+            "server.parse_tokens(irctokens.tokenise('329 * #chan 1584041889'))",
+            "created = server.channels['#chan'].created",
+            "assert type(created) is datetime, type(created)",
+            "assert created == datetime(2020, 3, 12, 19, 38, 9, tzinfo=timezone.utc)"
+        ])
+        subprocess.run([sys.executable, "-c", code], check=True)
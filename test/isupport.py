@@ -150,3 +150,22 @@ class ISupportTestCasemapping(unittest.TestCase):
         server.parse_tokens(irctokens.tokenise("001 nickname *"))
         with self.assertRaises(ValueError):
             server.parse_tokens(irctokens.tokenise("005 * CASEMAPPING=asd *"))
+
+class ISUPPORTTestChanmodeTable(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        table = server.isupport.chanmode_table
+        self.assertEqual(table["o"], (ircstates.isupport.MODE_PREFIX, True, True))
+        self.assertEqual(table["b"], (ircstates.isupport.MODE_LIST,   True, True))
+        self.assertEqual(table["k"], (ircstates.isupport.MODE_PARAM,  True, True))
+        self.assertEqual(table["l"], (ircstates.isupport.MODE_SET,    True, False))
+        self.assertEqual(table["i"], (ircstates.isupport.MODE_FLAG,   False, False))
+
+        server.parse_tokens(irctokens.tokenise(
+            "005 * CHANMODES=beI,k,lf,imnt PREFIX=(qov)~@+ *"))
+        table = server.isupport.chanmode_table
+        self.assertEqual(table["q"], (ircstates.isupport.MODE_PREFIX, True, True))
+        self.assertEqual(table["I"], (ircstates.isupport.MODE_LIST,   True, True))
+        self.assertEqual(table["f"], (ircstates.isupport.MODE_SET,    True, False))
+        self.assertNotIn("s", table)
@@ -0,0 +1,138 @@
+import unittest
+import ircstates, irctokens
+from ircstates.casemap    import CASEFOLDERS
+from ircstates.mask_match import MaskMatcher, normalise_mask
+
+RFC1459 = CASEFOLDERS[ircstates.CaseMap.RFC1459].fold
+
+class MaskMatchTestNormalise(unittest.TestCase):
+    def test(self):
+        self.assertEqual(normalise_mask("nick"),       "nick!*@*")
+        self.assertEqual(normalise_mask("nick!user"),  "nick!user@*")
+        self.assertEqual(normalise_mask("user@host"),  "*!user@host")
+        self.assertEqual(normalise_mask("a!b@c"),      "a!b@c")
+        self.assertEqual(normalise_mask("*!*@::1"),    "*!*@::1")
+        self.assertIsNone(normalise_mask("$a:account"))
+        self.assertIsNone(normalise_mask("r:my*gecos"))
+        self.assertIsNone(normalise_mask("~q:nick!*@*"))
+
+class MaskMatchTestMatcher(unittest.TestCase):
+    def test_kinds(self):
+        matcher = MaskMatcher(RFC1459, [
+            "*!*@exact.host",
+            "bad*!*@*",
+            "*!~ident@*.example.com",
+            "*!*@10.0.*.1",
+            "$a:account"
+        ])
+        self.assertEqual(len(matcher), 4)
+
+        self.assertEqual(
+            matcher.match("nick", "user", "exact.host"), ["*!*@exact.host"])
+        self.assertEqual(
+            matcher.match("BADnick", "user", "other"), ["bad*!*@*"])
+        self.assertEqual(
+            matcher.match("nick", "~ident", "a.b.example.com"),
+            ["*!~ident@*.example.com"])
+        self.assertEqual(
+            matcher.match("nick", "~ident2", "a.b.example.com"), [])
+        self.assertEqual(
+            matcher.match("nick", "user", "10.0.99.1"), ["*!*@10.0.*.1"])
+        self.assertEqual(matcher.match("nick", None, None), [])
+
+        self.assertTrue(matcher.matches("nick", "u", "10.0.1.1"))
+        self.assertFalse(matcher.matches("nick", "u", "10.0.1.2"))
+        self.assertFalse(matcher.matches("nick", "u", "example.com"))
+
+    def test_casefold(self):
+        matcher = MaskMatcher(RFC1459, ["Nick[1]!*@*.Host.COM"])
+        self.assertTrue(matcher.matches("nick{1}", "u", "a.host.com"))
+        self.assertTrue(matcher.matches("NICK[1]", "u", "A.HOST.COM"))
+
+    def test_remove(self):
+        matcher = MaskMatcher(RFC1459, ["*!*@host", "*!*@*.host", "*!*@h?st"])
+        matcher.remove("*!*@host")
+        matcher.remove("*!*@h?st")
+        self.assertFalse(matcher.matches("n", "u", "host"))
+        self.assertTrue(matcher.matches("n", "u", "a.host"))
+        matcher.remove("*!*@*.host")
+        self.assertEqual(len(matcher), 0)
+        self.assertFalse(matcher.matches("n", "u", "a.host"))
+
+    def test_remove_buckets(self):
+        # bans on ever-different hosts mustn't leave empty buckets behind
+        matcher = MaskMatcher(RFC1459)
+        for i in range(100):
+            for mask in [f"*!*@host{i}", f"*!*@*.host{i}.net", f"n{i}!*@*"]:
+                matcher.add(mask)
+                matcher.remove(mask)
+        self.assertEqual(matcher._exact,  {})
+        self.assertEqual(matcher._suffix, {})
+        self.assertEqual(len(matcher), 0)
+
+    def test_remove_shared_bucket(self):
+        matcher = MaskMatcher(RFC1459, ["a!*@host", "b!*@host"])
+        matcher.remove("a!*@host")
+        self.assertIn("host", matcher._exact)
+        self.assertTrue(matcher.matches("b", "u", "host"))
+        matcher.remove("b!*@host")
+        self.assertNotIn("host", matcher._exact)
+
+class MaskMatchTestServer(unittest.TestCase):
+    def _server(self) -> ircstates.Server:
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname!u@me JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":a!u@spam.net JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":b!u@x.spam.net JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":c!u@fine JOIN #chan"))
+        return server
+
+    def test(self):
+        server  = self._server()
+        channel = server.channels["#chan"]
+        self.assertEqual(server.list_mode_matches(channel), [])
+
+        server.parse_tokens(irctokens.tokenise("MODE #chan +b *!*@*.spam.net"))
+        self.assertEqual(server.list_mode_matches(channel),
+            [server.users["b"]])
+
+        server.parse_tokens(irctokens.tokenise("MODE #chan +b *!*@spam.net"))
+        self.assertEqual(server.list_mode_matches(channel),
+            [server.users["a"], server.users["b"]])
+
+        server.parse_tokens(irctokens.tokenise("MODE #chan -b *!*@*.spam.net"))
+        self.assertEqual(server.list_mode_matches(channel),
+            [server.users["a"]])
+
+    def test_banlist(self):
+        server  = self._server()
+        channel = server.channels["#chan"]
+        server.parse_tokens(irctokens.tokenise("MODE #chan +b c!*@*"))
+        self.assertEqual(server.list_mode_matches(channel),
+            [server.users["c"]])
+
+        server.parse_tokens(irctokens.tokenise("367 * #chan a!*@* s 1"))
+        server.parse_tokens(irctokens.tokenise("368 * #chan :end"))
+        self.assertEqual(server.list_mode_matches(channel),
+            [server.users["a"]])
+
+    def test_quiets(self):
+        server  = self._server()
+        channel = server.channels["#chan"]
+        server.parse_tokens(irctokens.tokenise("005 * CHANMODES=bq,k,l,imnt *"))
+        server.parse_tokens(irctokens.tokenise("MODE #chan +q *!*@fine"))
+        self.assertEqual(server.list_mode_matches(channel, "q"),
+            [server.users["c"]])
+        self.assertEqual(server.list_mode_matches(channel, "b"), [])
+
+    def test_casemapping(self):
+        server  = self._server()
+        channel = server.channels["#chan"]
+        server.parse_tokens(irctokens.tokenise(":d[x]!u@h JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise("MODE #chan +b D{X}!*@*"))
+        self.assertEqual(server.list_mode_matches(channel),
+            [server.users["d{x}"]])
+
+        server.parse_tokens(irctokens.tokenise("005 * CASEMAPPING=ascii *"))
+        self.assertEqual(server.list_mode_matches(channel), [])
@@ -0,0 +1,62 @@
+import unittest, unittest.mock
+import ircstates, irctokens
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.parse_tokens(irctokens.tokenise("001 nickname *"))
+
+    def test(self):
+        metrics = self.server.enable_metrics()
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":other JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise("PING :x"))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["lines"], 3)
+        self.assertEqual(set(snapshot["commands"]), {"JOIN", "PING"})
+        join = snapshot["commands"]["JOIN"]
+        self.assertEqual(join["calls"], 2)
+        self.assertGreater(join["seconds"], 0)
+        self.assertLessEqual(join["max_seconds"], join["seconds"])
+
+    def test_callback(self):
+        seen = []
+        self.server.enable_metrics(
+            lambda command, lines, seconds: seen.append((command, lines)))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.assertEqual(seen, [("JOIN", 1)])
+
+    def test_disable(self):
+        self.server.enable_metrics()
+        self.assertIn("parse_tokens", self.server.__dict__)
+        self.server.disable_metrics()
+        self.assertIsNone(self.server.metrics)
+        self.assertNotIn("parse_tokens", self.server.__dict__)
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.assertIn("#chan", self.server.channels)
+
+    def test_batch(self):
+        metrics = self.server.enable_metrics()
+        self.server.parse_lines([
+            irctokens.tokenise(":nickname JOIN #chan"),
+            irctokens.tokenise(":a JOIN #chan"),
+            irctokens.tokenise(":b JOIN #chan"),
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ])
+        self.assertEqual(metrics.lines, 5)
+        self.assertEqual(metrics.calls, {"JOIN": 3, "QUIT": 2})
+
+    def test_disabled_untimed(self):
+        # no clock reads at all while metrics are off, fused runs included
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        lines = [
+            irctokens.tokenise(":a JOIN #chan"),
+            irctokens.tokenise(":b JOIN #chan"),
+            irctokens.tokenise(":a QUIT :*.net *.split"),
+            irctokens.tokenise(":b QUIT :*.net *.split")
+        ]
+        with unittest.mock.patch("ircstates.server.perf_counter") as clock:
+            self.server.parse_lines(lines)
+        clock.assert_not_called()
@@ -1,4 +1,5 @@
 import unittest
+import pendulum
 import ircstates, irctokens
 
 
@@ -48,13 +49,15 @@ class ModeTestChannelList(unittest.TestCase):
         server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
 
         channel = server.channels["#chan"]
-        self.assertEqual(channel.list_modes, {"b": []})
+        self.assertEqual(channel.list_modes, {"b": {}})
 
-        server.parse_tokens(irctokens.tokenise("MODE #chan +b asd!*@*"))
-        self.assertEqual(channel.list_modes, {"b": ["asd!*@*"]})
+        server.parse_tokens(irctokens.tokenise(":other MODE #chan +b asd!*@*"))
+        self.assertEqual(list(channel.list_modes["b"]), ["asd!*@*"])
+        self.assertEqual(channel.list_modes["b"]["asd!*@*"].setter, "other")
+        self.assertIsNotNone(channel.list_modes["b"]["asd!*@*"].set_at)
 
         server.parse_tokens(irctokens.tokenise("MODE #chan -b asd!*@*"))
-        self.assertEqual(channel.list_modes, {"b": []})
+        self.assertEqual(channel.list_modes, {"b": {}})
 
     def test_remove(self):
         server = ircstates.Server("test")
@@ -64,7 +67,7 @@ class ModeTestChannelList(unittest.TestCase):
         server.parse_tokens(irctokens.tokenise("MODE #chan +b dsa!*@*"))
         server.parse_tokens(irctokens.tokenise("MODE #chan -b asd!*@*"))
         channel = server.channels["#chan"]
-        self.assertEqual(channel.list_modes, {"b": ["dsa!*@*"]})
+        self.assertEqual(list(channel.list_modes["b"]), ["dsa!*@*"])
 
     def test_banlist(self):
         server = ircstates.Server("test")
@@ -80,9 +83,18 @@ class ModeTestChannelList(unittest.TestCase):
 
         channel = server.channels["#chan"]
         self.assertEqual(
-            channel.list_modes["b"],
+            list(channel.list_modes["b"]),
             ["*!*@host", "$a:account", "r:my*gecos"]
         )
+        entry = channel.list_modes["b"]["*!*@host"]
+        self.assertEqual(entry.setter, "setby")
+        self.assertEqual(entry.set_at, pendulum.from_timestamp(1594477713))
+        entry = channel.list_modes["b"]["r:my*gecos"]
+        self.assertIsNone(entry.setter)
+        self.assertIsNone(entry.set_at)
+
+        server.parse_tokens(irctokens.tokenise("368 * #chan *"))
+        self.assertEqual(channel.list_modes["b"], {})
 
     def test_quietlist(self):
         server = ircstates.Server("test")
@@ -98,9 +110,12 @@ class ModeTestChannelList(unittest.TestCase):
 
         channel = server.channels["#chan"]
         self.assertEqual(
-            channel.list_modes["q"],
+            list(channel.list_modes["q"]),
             ["q!*@host", "$a:qaccount", "r:q*my*gecos"]
         )
+        entry = channel.list_modes["q"]["$a:qaccount"]
+        self.assertEqual(entry.setter, "setby")
+        self.assertEqual(entry.set_at, pendulum.from_timestamp(1594477713))
 
 
 class ModeTestChannelTypeB(unittest.TestCase):
@@ -166,7 +181,7 @@ class ModeTestChannelNumeric(unittest.TestCase):
             irctokens.tokenise("324 * #chan +bkli *!*@* pass 10"))
         channel = server.channels["#chan"]
         self.assertEqual(channel.modes, {"k": "pass", "l": "10", "i": None})
-        self.assertEqual(channel.list_modes, {"b": ["*!*@*"]})
+        self.assertEqual(list(channel.list_modes["b"]), ["*!*@*"])
 
     def test_without_plus(self):
         server = ircstates.Server("test")
@@ -188,3 +203,25 @@ class ModeTestUserNumeric(unittest.TestCase):
         server.parse_tokens(irctokens.tokenise("001 nickname *"))
         server.parse_tokens(irctokens.tokenise("221 * iw"))
         self.assertEqual(server.modes, {"i", "w"})
+
+class ModeTestChannelMixed(unittest.TestCase):
+    def test(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":other JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(
+            "MODE #chan +ovbl-o+k other other a!*@* 10 Nickname key"))
+        channel = server.channels["#chan"]
+        self.assertEqual(channel.users["other"].modes, {"o", "v"})
+        self.assertEqual(channel.users["nickname"].modes, set())
+        self.assertEqual(channel.modes, {"l": "10", "k": "key"})
+        self.assertEqual(list(channel.list_modes["b"]), ["a!*@*"])
+
+    def test_unknown_user(self):
+        server = ircstates.Server("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise("MODE #chan +o-i+m missing"))
+        channel = server.channels["#chan"]
+        self.assertEqual(channel.modes, {"m": None})
@@ -0,0 +1,115 @@
+import io, unittest
+import ircstates, irctokens
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        for line in [
+            "CAP * LS :multi-prefix sasl=PLAIN,EXTERNAL",
+            "CAP * ACK :multi-prefix",
+            "001 nickname *",
+            "005 * CASEMAPPING=ascii CHANMODES=bq,k,l,imnpst NETWORK=a\\x20b *",
+            "375 * :start",
+            "372 * :hello",
+            ":nickname!user@host JOIN #Chan",
+            "353 * * #Chan :@nickname +Other!u@h ünïcode",
+            "366 * #Chan *",
+            "332 * #Chan :the topic",
+            "333 * #Chan setter 1600000000",
+            "329 * #Chan 1500000000",
+            "324 * #Chan +ntk key",
+            "367 * #Chan *!*@a setter 1600000001",
+            "368 * #Chan *",
+            ":nickname MODE #Chan +q *!*@q",
+            ":nickname JOIN #two",
+            ":Other JOIN #two",
+            ":nickname PART #two"
+        ]:
+            self.server.parse_tokens(irctokens.tokenise(line))
+        self.server.users["other"].account = "acc"
+
+    def _restore(self, data: bytes) -> ircstates.Server:
+        server = ircstates.Server("test")
+        server.restore(io.BytesIO(data))
+        return server
+
+    def _snapshot(self) -> bytes:
+        fp = io.BytesIO()
+        self.server.snapshot(fp)
+        return fp.getvalue()
+
+    def test(self):
+        data = self._snapshot()
+        self.assertEqual(data[:4], b"IRCS")
+        server = self._restore(data)
+
+        self.assertEqual(server.nickname, "nickname")
+        self.assertEqual(server.username, "user")
+        self.assertTrue(server.registered)
+        self.assertEqual(server.motd, self.server.motd)
+        self.assertEqual(server.isupport.raw, self.server.isupport.raw)
+        self.assertEqual(server.isupport.network, "a b")
+        self.assertEqual(server.isupport.casemapping, ircstates.CaseMap.ASCII)
+        self.assertEqual(server.available_caps, self.server.available_caps)
+        self.assertEqual(server.agreed_caps, ["multi-prefix"])
+        self.assertEqual(server.stats(), self.server.stats())
+
+        self.assertEqual(list(server.users), list(self.server.users))
+        other = server.users["other"]
+        self.assertEqual(other.nickname, "Other")
+        self.assertEqual(other.hostname, "h")
+        self.assertEqual(other.account,  "acc")
+        self.assertEqual(other.channels, {"#chan"})
+        self.assertIn("ünïcode", server.users)
+
+        channel = server.channels["#chan"]
+        before  = self.server.channels["#chan"]
+        self.assertEqual(channel.name, "#Chan")
+        self.assertEqual(channel.topic, "the topic")
+        self.assertEqual(channel.topic_time, before.topic_time)
+        self.assertEqual(channel.created, before.created)
+        self.assertEqual(channel.modes, {"n": None, "t": None, "k": "key"})
+        self.assertEqual(list(channel.list_modes["b"]), ["*!*@a"])
+        self.assertEqual(channel.list_modes["b"]["*!*@a"].setter, "setter")
+        self.assertEqual(channel.list_modes["b"]["*!*@a"].set_at,
+            before.list_modes["b"]["*!*@a"].set_at)
+        self.assertEqual(list(channel.list_modes["q"]), ["*!*@q"])
+
+        self.assertEqual(channel.users["nickname"].modes, {"o"})
+        self.assertEqual(channel.users["other"].modes,    {"v"})
+        self.assertEqual(channel.users["other"].since,
+            before.users["other"].since)
+        self.assertIs(channel.users["other"].get_user(), other)
+
+    def test_continues(self):
+        server = self._restore(self._snapshot())
+        server.parse_tokens(irctokens.tokenise(":Other NICK other2"))
+        server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.assertEqual(server.users, {})
+        self.assertEqual(server.stats()["memberships"], 0)
+
+    def test_not_snapshot(self):
+        with self.assertRaises(ircstates.SnapshotException):
+            self._restore(b"nope")
+
+    def test_version(self):
+        data = self._snapshot()
+        with self.assertRaises(ircstates.SnapshotException):
+            self._restore(data[:4] + b"\x01\x00\x00\x00\x02\x00\x00\x00" + data[12:])
+
+    def test_truncated(self):
+        data = self._snapshot()
+        for end in [10, len(data)//2, len(data)-1]:
+            with self.assertRaises(ircstates.SnapshotException):
+                self._restore(data[:end])
+
+    def test_unchanged(self):
+        # a snapshot that's caught as bad before restoring starts doesn't
+        # touch what the server already knows
+        data  = self._snapshot()
+        stats = self.server.stats()
+        for bad in [b"nope", data[:len(data)//2]]:
+            with self.assertRaises(ircstates.SnapshotException):
+                self.server.restore(io.BytesIO(bad))
+            self.assertEqual(self.server.stats(), stats)
+            self.assertIn("#chan", self.server.channels)
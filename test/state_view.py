@@ -0,0 +1,127 @@
+import io, os, random, tempfile, unittest
+import ircstates, irctokens
+
+class StateViewTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        for line in [
+            "001 nickname *",
+            "005 * CASEMAPPING=rfc1459 *",
+            ":nickname!user@host JOIN #Chan",
+            "353 * * #Chan :@nickname +Other[a]!u@h zed ünïcode",
+            "366 * #Chan *",
+            "332 * #Chan :the topic",
+            "333 * #Chan setter 1600000000",
+            "324 * #Chan +ntk key",
+            ":nickname JOIN #two",
+            ":Other[a] JOIN #two"
+        ]:
+            self.server.parse_tokens(irctokens.tokenise(line))
+        self.server.users["other{a}"].account = "acc"
+
+    def _export(self) -> bytes:
+        fp = io.BytesIO()
+        self.server.export(fp)
+        return fp.getvalue()
+
+    def _check(self, view: ircstates.StateView):
+        self.assertEqual(view.user_count,    4)
+        self.assertEqual(view.channel_count, 2)
+        self.assertEqual(view.casemapping, ircstates.CaseMap.RFC1459)
+
+        self.assertTrue(view.has_user("OTHER{A}"))
+        self.assertTrue(view.has_user("ünïcode"))
+        self.assertFalse(view.has_user("nobody"))
+        self.assertIsNone(view.get_user("nobody"))
+        user = view.get_user("other[a]")
+        self.assertIsNotNone(user)
+        self.assertEqual(user.nickname, "Other[a]")
+        self.assertEqual(user.nickname_lower, "other{a}")
+        self.assertEqual(user.username, "u")
+        self.assertEqual(user.hostname, "h")
+        self.assertEqual(user.account,  "acc")
+        self.assertIsNone(user.realname)
+        self.assertEqual(user.channels, ["#chan", "#two"])
+
+        self.assertTrue(view.has_channel("#CHAN"))
+        self.assertFalse(view.has_channel("#nope"))
+        self.assertIsNone(view.get_channel("#nope"))
+        channel = view.get_channel("#chan")
+        before  = self.server.channels["#chan"]
+        self.assertEqual(channel.name, "#Chan")
+        self.assertEqual(channel.topic, "the topic")
+        self.assertEqual(channel.topic_setter, "setter")
+        self.assertEqual(channel.topic_time, before.topic_time)
+        self.assertIsNone(channel.created)
+        self.assertEqual(channel.modes, {"n": None, "t": None, "k": "key"})
+        self.assertEqual(set(channel.users), set(before.users))
+
+        self.assertTrue(channel.has_user("Zed"))
+        self.assertFalse(view.get_channel("#two").has_user("zed"))
+        channel_user = channel.get_user("other[a]")
+        self.assertIsNotNone(channel_user)
+        self.assertEqual(channel_user.modes, {"v"})
+        self.assertEqual(channel_user.since,
+            before.users["other{a}"].since)
+        self.assertEqual(channel_user.nickname, "Other[a]")
+        self.assertEqual(channel_user.channel, "#Chan")
+        self.assertEqual(channel.get_user("nickname").modes, {"o"})
+
+    def test_bytes(self):
+        self._check(ircstates.StateView(self._export()))
+
+    def test_mmap(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                self.server.export(fp)
+            with ircstates.StateView.open(path) as view:
+                self._check(view)
+        finally:
+            os.remove(path)
+
+    def test_empty(self):
+        fp = io.BytesIO()
+        ircstates.Server("test").export(fp)
+        view = ircstates.StateView(fp.getvalue())
+        self.assertEqual(view.user_count, 0)
+        self.assertFalse(view.has_user("nickname"))
+        self.assertFalse(view.has_channel("#chan"))
+
+    def test_not_export(self):
+        with self.assertRaises(ircstates.SnapshotException):
+            ircstates.StateView(b"IRCS" + b"\0"*28)
+
+    def test_truncated(self):
+        data = self._export()
+        for end in [10, len(data)//2, len(data)-1]:
+            with self.assertRaises(ircstates.SnapshotException):
+                ircstates.StateView(data[:end])
+
+    def test_corrupt(self):
+        # damage anywhere fails lookups with SnapshotException, nothing else
+        data = self._export()
+        rand = random.Random(0)
+        for _ in range(500):
+            corrupt = bytearray(data)
+            for _ in range(rand.randint(1, 4)):
+                corrupt[rand.randrange(8, len(corrupt))] = rand.randrange(256)
+            if rand.random() < 0.2:
+                corrupt = corrupt[:rand.randrange(len(corrupt))]
+            try:
+                view = ircstates.StateView(bytes(corrupt))
+                for nickname in ["nickname", "other[a]", "zed", "ünïcode"]:
+                    user = view.get_user(nickname)
+                    if user is not None:
+                        user.nickname, user.account, user.channels
+                for name in ["#chan", "#two"]:
+                    channel = view.get_channel(name)
+                    if channel is not None:
+                        channel.name, channel.topic, channel.modes
+                        channel.topic_time, channel.created
+                        for channel_user in channel.users.values():
+                            channel_user.nickname, channel_user.modes
+                            channel_user.since, channel_user.joined
+                        channel.has_user("zed")
+            except ircstates.SnapshotException:
+                pass
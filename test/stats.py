@@ -0,0 +1,123 @@
+import random, unittest
+import ircstates, irctokens
+
+def _walk(server):
+    return (
+        sum(len(channel.users) for channel in server.channels.values()),
+        sum(len(entries) for channel in server.channels.values()
+            for entries in channel.list_modes.values())
+    )
+
+class StatsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.teardown_chunk = 1
+        for line in [
+            "CAP * LS :multi-prefix sasl",
+            "001 nickname *",
+            "005 * CHANMODES=bq,k,l,imnpst *",
+            ":nickname JOIN #chan",
+            ":nickname JOIN #chan2",
+            "353 * * #chan :a b c @d",
+            ":a JOIN #chan2",
+            ":e JOIN #chan2",
+            "367 * #chan *!*@a",
+            "367 * #chan *!*@b",
+            "368 * #chan *",
+            ":d MODE #chan +bbq *!*@c *!*@a *!*@q",
+            ":d MODE #chan -b+l *!*@b 10"
+        ]:
+            self.server.parse_tokens(irctokens.tokenise(line))
+
+    def test(self):
+        stats = self.server.stats()
+        self.assertEqual(stats["users"],             6)
+        self.assertEqual(stats["channels"],          2)
+        self.assertEqual(stats["memberships"],       8)
+        self.assertEqual(stats["list_mode_entries"], 3)
+        self.assertEqual(stats["available_caps"],    2)
+        self.assertEqual(stats["isupport_tokens"],   1)
+        self.assertGreater(stats["bytes"], 0)
+        self.assertEqual(
+            (stats["memberships"], stats["list_mode_entries"]),
+            _walk(self.server))
+
+    def test_departures(self):
+        for line in [
+            ":a NICK aa",
+            ":b PART #chan",
+            ":d KICK #chan c",
+            ":aa QUIT :bye",
+            ":e QUIT :*.net *.split",
+            ":nickname JOIN #chan3",
+            ":d JOIN #chan3",
+        ]:
+            self.server.parse_tokens(irctokens.tokenise(line))
+        stats = self.server.stats()
+        self.assertEqual(stats["memberships"], 5)
+        self.assertEqual(
+            (stats["memberships"], stats["list_mode_entries"]),
+            _walk(self.server))
+
+    def test_self_part(self):
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.assertEqual(self.server.stats()["list_mode_entries"], 0)
+        self.server.collect()
+        stats = self.server.stats()
+        self.assertEqual(stats["users"], 3)
+        self.assertEqual(
+            (stats["memberships"], stats["list_mode_entries"]),
+            _walk(self.server))
+
+        self.server.parse_tokens(irctokens.tokenise("ERROR :bye"))
+        stats = self.server.stats()
+        self.assertEqual(stats["memberships"], 0)
+        self.assertEqual(stats["bytes"], 0)
+
+    def test_quit_pending_teardown(self):
+        # members of a channel we've left quitting (or splitting) before
+        # they've been collected
+        self.server.parse_tokens(irctokens.tokenise(":nickname PART #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":a QUIT :bye"))
+        self.server.parse_lines([
+            irctokens.tokenise(":b QUIT :x.net y.net"),
+            irctokens.tokenise(":c QUIT :x.net y.net")
+        ])
+        self.server.collect()
+        self.assertEqual(self.server.stats()["memberships"], 2)
+        self.assertEqual(self.server.stats()["memberships"],
+            _walk(self.server)[0])
+
+    def test_random(self):
+        # traffic a server could really send us, from what we know
+        rand = random.Random(0)
+        nicknames = [f"n{i}" for i in range(12)]
+        for _ in range(3000):
+            server   = self.server
+            channel  = rand.choice(["#a", "#b", "#c"])
+            ours     = server.channels.get(channel, None)
+            members  = sorted(ours.users) if ours else []
+            members  = [m for m in members if not m == "nickname"]
+            # on one of our channels, or could be anyone
+            shared   = {n for c in server.channels.values() for n in c.users}
+            outside  = [n for n in nicknames if not n in shared]
+
+            lines = [f":nickname JOIN {channel}" if ours is None
+                else f":nickname PART {channel}"]
+            if ours is not None:
+                lines += [f":{n} JOIN {channel}" for n in outside[:1]]
+                lines += [f"353 * * {channel} :{n}" for n in outside[:1]]
+            if members:
+                member = rand.choice(members)
+                lines += [
+                    f":{member} PART {channel}",
+                    f":{member} KICK {channel} {rand.choice(members)}",
+                    f":{member} QUIT :bye",
+                    f":{member} QUIT :x.net y.net"
+                ]
+                lines += [f":{member} NICK {n}" for n in outside[:1]]
+
+            line = rand.choice(lines)
+            server.parse_tokens(irctokens.tokenise(line))
+            self.assertEqual(server.stats()["memberships"],
+                _walk(server)[0], line)
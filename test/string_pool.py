@@ -0,0 +1,106 @@
+import unittest
+import ircstates, irctokens
+
+class StringPoolTest(unittest.TestCase):
+    def test_intern(self):
+        pool = ircstates.StringPool()
+        a = "".join(["ho", "st"])
+        b = "".join(["hos", "t"])
+        self.assertIsNot(a, b)
+        self.assertIs(pool.intern(a), a)
+        self.assertIs(pool.intern(b), a)
+        self.assertIsNone(pool.intern(None))
+        self.assertEqual(pool.stats(),
+            {"size": 1, "maxsize": 65536, "hits": 1, "misses": 1})
+
+    def test_eviction(self):
+        pool = ircstates.StringPool(maxsize=2)
+        pool.intern("a")
+        pool.intern("b")
+        pool.intern("a")
+        pool.intern("c")
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(list(pool._pool), ["a", "c"])
+
+class StringPoolTestServer(unittest.TestCase):
+    def test_join(self):
+        server = ircstates.Server("test")
+        server.string_pool = ircstates.StringPool()
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":a!~u@cloak JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":b!~u@cloak JOIN #chan"))
+
+        user_a = server.users["a"]
+        user_b = server.users["b"]
+        self.assertIs(user_a.username, user_b.username)
+        self.assertIs(user_a.hostname, user_b.hostname)
+        self.assertEqual(server.string_pool.hits, 2)
+
+    def test_whox(self):
+        server = ircstates.Server("test")
+        server.string_pool = ircstates.StringPool()
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":a JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":b JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(
+            "354 * 735 ~u 0.0.0.0 cloak irc.server a H acc :real"))
+        server.parse_tokens(irctokens.tokenise(
+            "354 * 735 ~u 0.0.0.0 cloak irc.server b H acc :real"))
+
+        user_a = server.users["a"]
+        user_b = server.users["b"]
+        self.assertIs(user_a.server,  user_b.server)
+        self.assertIs(user_a.account, user_b.account)
+        self.assertEqual(user_a.account, "acc")
+
+    def test_message(self):
+        server = ircstates.Server("test")
+        server.string_pool = ircstates.StringPool()
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":a JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":b JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":a!~u@cloak PRIVMSG #chan :hi"))
+        server.parse_tokens(irctokens.tokenise(":b!~u@cloak PRIVMSG #chan :hi"))
+
+        user_a = server.users["a"]
+        user_b = server.users["b"]
+        self.assertIs(user_a.username, user_b.username)
+        self.assertIs(user_a.hostname, user_b.hostname)
+
+    def test_other_handlers(self):
+        server = ircstates.Server("test")
+        server.string_pool = ircstates.StringPool()
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        for nickname in ["a", "b"]:
+            server.parse_tokens(irctokens.tokenise(f":{nickname} JOIN #chan"))
+        user_a = server.users["a"]
+        user_b = server.users["b"]
+
+        for nickname in ["a", "b"]:
+            server.parse_tokens(irctokens.tokenise(
+                f"311 * {nickname} ~u cloak * :real name"))
+        self.assertIs(user_a.username, user_b.username)
+        self.assertIs(user_a.hostname, user_b.hostname)
+        self.assertIs(user_a.realname, user_b.realname)
+
+        for nickname in ["a", "b"]:
+            server.parse_tokens(
+                irctokens.tokenise(f":{nickname} CHGHOST ~v cloak2"))
+            server.parse_tokens(irctokens.tokenise(f":{nickname} ACCOUNT acc"))
+            server.parse_tokens(irctokens.tokenise(f":{nickname} SETNAME :new"))
+        self.assertIs(user_a.username, user_b.username)
+        self.assertIs(user_a.hostname, user_b.hostname)
+        self.assertIs(user_a.account,  user_b.account)
+        self.assertIs(user_a.realname, user_b.realname)
+
+    def test_disabled(self):
+        server = ircstates.Server("test")
+        self.assertIsNone(server.string_pool)
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        server.parse_tokens(irctokens.tokenise(":a!~u@cloak JOIN #chan"))
+        self.assertEqual(server.users["a"].hostname, "cloak")
@@ -0,0 +1,20 @@
+import unittest
+from benchmark.corpus     import CORPORA
+from benchmark.throughput import _server, run
+
+class ThroughputTest(unittest.TestCase):
+    def test_corpora(self):
+        for name in CORPORA:
+            result = run(name, 0.02)
+            self.assertGreater(result["lines"], 0)
+            self.assertGreater(result["lines_per_sec"], 0)
+            self.assertEqual(
+                sum(h["calls"] for h in result["handlers"].values()),
+                result["lines"])
+
+    def test_setup(self):
+        corpus = CORPORA["netsplit"](0.02)
+        server = _server(corpus.setup)
+        self.assertEqual(server.nickname, "me")
+        self.assertEqual(set(server.channels), {"#one", "#two", "#three"})
+        self.assertEqual(len(server.users), 201)
@@ -290,3 +290,30 @@ class UserTestSETNAME(unittest.TestCase):
             irctokens.tokenise(":other SETNAME :tyrannosaurus hex"))
         self.assertEqual(server.realname, "new now know how")
         self.assertEqual(user.realname, "tyrannosaurus hex")
+
+class UserTestSubclass(unittest.TestCase):
+    def test_extra_attributes(self):
+        class MyUser(ircstates.User):
+            def __init__(self, nickname):
+                super().__init__(nickname)
+                self.seen = 0
+        class MyChannel(ircstates.Channel):
+            def __init__(self, name):
+                super().__init__(name)
+                self.seen = 0
+        class MyServer(ircstates.Server):
+            def create_user(self, nickname):
+                return MyUser(nickname)
+            def create_channel(self, name):
+                return MyChannel(name)
+
+        server = MyServer("test")
+        server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        user = server.users["nickname"]
+        channel = server.channels["#chan"]
+        user.seen += 1
+        channel.seen += 1
+        self.assertEqual(user.seen, 1)
+        self.assertEqual(channel.seen, 1)
+        self.assertEqual(user.channels, {"#chan"})
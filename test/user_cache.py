@@ -0,0 +1,135 @@
+import unittest
+import ircstates, irctokens
+from ircstates.names import Name
+
+class UserCacheTest(unittest.TestCase):
+    def test_take(self):
+        cache = ircstates.UserCache()
+        user = ircstates.User(Name("Nick", "nick"))
+        user.username = "user"
+        user.hostname = "host"
+        cache.add(user)
+        self.assertIn("nick", cache)
+        self.assertIsNone(cache.take("nick", "user", "otherhost"))
+        self.assertNotIn("nick", cache)
+
+        cache.add(user)
+        self.assertIs(cache.take("nick", "user", "host"), user)
+        self.assertEqual(cache.stats(),
+            {"size": 0, "maxsize": 1024, "hits": 1, "misses": 1})
+
+    def test_eviction(self):
+        cache = ircstates.UserCache(maxsize=2)
+        for nickname in ["a", "b", "c"]:
+            cache.add(ircstates.User(Name(nickname, nickname)))
+        self.assertEqual(list(cache._users), ["b", "c"])
+
+class UserCacheTestServer(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.user_cache = ircstates.UserCache()
+        self.server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":other!u@h JOIN #chan"))
+        self.user = self.server.users["other"]
+        self.user.account = "acc"
+        self.user.ip      = "127.0.0.1"
+
+    def test_part(self):
+        self.server.parse_tokens(irctokens.tokenise(":other PART #chan"))
+        self.assertNotIn("other", self.server.users)
+        self.server.parse_tokens(irctokens.tokenise(":other!u@h JOIN #chan"))
+        user = self.server.users["other"]
+        self.assertIs(user, self.user)
+        self.assertEqual(user.ip, "127.0.0.1")
+        self.assertEqual(user.channels, {"#chan"})
+
+    def test_quit(self):
+        self.server.parse_tokens(irctokens.tokenise(":other QUIT :bye"))
+        self.server.parse_tokens(irctokens.tokenise(":Other!u@h JOIN #chan"))
+        user = self.server.users["other"]
+        self.assertIs(user, self.user)
+        self.assertEqual(user.nickname, "Other")
+        self.assertEqual(user.account,  "acc")
+
+    def test_different_host(self):
+        self.server.parse_tokens(irctokens.tokenise(":other QUIT :bye"))
+        self.server.parse_tokens(irctokens.tokenise(":other!u@h2 JOIN #chan"))
+        self.assertIsNot(self.server.users["other"], self.user)
+        self.assertIsNone(self.server.users["other"].account)
+
+    def test_names(self):
+        # plain NAMES doesn't say who someone is; don't guess
+        self.server.parse_tokens(irctokens.tokenise(":other PART #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #b"))
+        self.server.parse_tokens(
+            irctokens.tokenise("353 nickname = #b :nickname other"))
+        user = self.server.users["other"]
+        self.assertIsNot(user, self.user)
+        self.assertIsNone(user.account)
+        self.assertIsNone(user.ip)
+
+    def test_unknown_host(self):
+        self.user.hostname = None
+        self.server.parse_tokens(irctokens.tokenise(":other QUIT :bye"))
+        self.server.parse_tokens(irctokens.tokenise(":other!u@h JOIN #chan"))
+        self.assertIsNot(self.server.users["other"], self.user)
+
+    def test_disabled(self):
+        self.server.user_cache = None
+        self.server.parse_tokens(irctokens.tokenise(":other PART #chan"))
+        self.server.parse_tokens(irctokens.tokenise(":other!u@h JOIN #chan"))
+        self.assertIsNot(self.server.users["other"], self.user)
+
+class UserCacheTestTTL(unittest.TestCase):
+    def test(self):
+        now = [0.0]
+        cache = ircstates.UserCache(ttl=10)
+        cache.clock = lambda: now[0]
+        user = ircstates.User(Name("a", "a"))
+        user.username = "u"
+        user.hostname = "h"
+        cache.add(user)
+        now[0] = 5.0
+        self.assertIs(cache.get("a", "u", "h"), user)
+        now[0] = 14.0
+        self.assertIs(cache.get("a", "u", "h"), user)
+        now[0] = 25.0
+        self.assertIsNone(cache.get("a", "u", "h"))
+        self.assertEqual(len(cache), 0)
+
+class UserCacheTestOffChannel(unittest.TestCase):
+    def setUp(self):
+        self.server = ircstates.Server("test")
+        self.server.user_cache = ircstates.UserCache()
+        self.server.parse_tokens(irctokens.tokenise("001 nickname *"))
+        self.server.parse_tokens(irctokens.tokenise(":nickname JOIN #chan"))
+
+    def test_privmsg(self):
+        emit1 = self.server.parse_tokens(
+            irctokens.tokenise(":other!u@h PRIVMSG nickname :hi"))
+        emit2 = self.server.parse_tokens(
+            irctokens.tokenise(":other!u@h NOTICE nickname :hi"))
+        self.assertIs(emit1.user, emit2.user)
+        self.assertEqual(emit2.user.hostname, "h")
+        self.assertNotIn("other", self.server.users)
+
+        self.server.parse_tokens(irctokens.tokenise(":other!u@h JOIN #chan"))
+        self.assertIs(self.server.users["other"], emit1.user)
+        self.assertNotIn("other", self.server.user_cache)
+
+    def test_kick(self):
+        self.server.parse_tokens(irctokens.tokenise(":other JOIN #chan"))
+        emit1 = self.server.parse_tokens(
+            irctokens.tokenise(":op!u@h KICK #chan other"))
+        emit2 = self.server.parse_tokens(
+            irctokens.tokenise(":op!u@h PRIVMSG #chan :bye"))
+        self.assertIs(emit1.user_source, emit2.user)
+
+    def test_without_cache(self):
+        self.server.user_cache = None
+        emit1 = self.server.parse_tokens(
+            irctokens.tokenise(":other!u@h PRIVMSG nickname :hi"))
+        emit2 = self.server.parse_tokens(
+            irctokens.tokenise(":other!u@h PRIVMSG nickname :hi"))
+        self.assertIsNot(emit1.user, emit2.user)